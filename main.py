@@ -1,18 +1,28 @@
+import argparse
 import random
 import os
 import sys
 from typing import List, Optional
-import pandas as pd
 
-from src.tstree.tstree import TSTree
-from src.btree.btree import Btree
-from src.benchmark.benchmark import run_comparison
+# Heavy modules (pandas, seaborn, matplotlib) are imported inside the
+# commands that need them, so `main.py run` starts in milliseconds.
+from src.benchmark.benchmark import calibrate, run_comparison
+from src.benchmark.registry import TREE_REGISTRY, builtin_gap, get_tree_specs
+from src.benchmark.results_store import DEFAULT_STORE
+
+
+DEFAULT_CASES = ("best", "worst", "average")
 
 
 sys.setrecursionlimit(100_000)  
-def run_cron_comparison(person_name: str | None, sizes: List[int], repeat: int):
+def run_cron_comparison(person_name: str | None, sizes: List[int], repeat: int,
+                        store: str | None = DEFAULT_STORE,
+                        trees: List[str] | None = None,
+                        profile_dir: str | None = None,
+                        cases: List[str] = DEFAULT_CASES):
     """
-    Runs the comparison and saves the results to a CSV file.
+    Runs the comparison, appends every sample to the results store and saves
+    the averaged results to a CSV file.
     This function performs a series of comparisons using the TSTree and Btree
     data structures, generating datasets of specified sizes and repeating the
 
@@ -20,16 +30,25 @@ def run_cron_comparison(person_name: str | None, sizes: List[int], repeat: int):
     :param person_name: Optional name to include in the filename.
     :param sizes: List of dataset sizes to benchmark.
     :param repeat: Number of times to repeat each benchmark for averaging.
+    :param store: Path of the SQLite results store, or None to skip it.
+    :param trees: Labels from `TREE_REGISTRY`; None runs the custom trees
+                  together with all builtin baselines.
+    :param profile_dir: If given, write per-(tree, case, size) profiles here.
+    :param cases: Word cases to run, e.g. "best", "worst", "average" or
+                  "corpus:<path>".
     :return: None
     """
     random.seed(100)
-    
-    df_best = run_comparison(sizes, tree_specs=[("tst", TSTree), ("bst", Btree)], repeat=repeat, case="best")
-    df_worst = run_comparison(sizes, tree_specs=[("tst", TSTree), ("bst", Btree)], repeat=repeat, case="worst")
-    df_average = run_comparison(sizes, tree_specs=[("tst", TSTree), ("bst", Btree)], repeat=repeat, case="average")
-    
-    # Combine results
-    df = pd.concat([df_best, df_worst, df_average], keys=["best", "worst", "average"], names=["case"])
+    samples = []
+    tree_specs = get_tree_specs(trees)
+
+    frames = [run_comparison(sizes, tree_specs=tree_specs, repeat=repeat, case=case,
+                             samples=samples, profile_dir=profile_dir)
+              for case in cases]
+
+    # Combine results (pandas is only needed from here on)
+    import pandas as pd
+    df = pd.concat(frames, keys=list(cases), names=["case"])
 
     # check if data/ directory exists
     os.makedirs("data", exist_ok=True)
@@ -42,8 +61,25 @@ def run_cron_comparison(person_name: str | None, sizes: List[int], repeat: int):
     
     df.to_csv(filename, index=True)
     print(f"Saved results to {filename}")
+
+    if store:
+        from src.benchmark.results_store import append_results, collect_run_metadata
+        metadata = collect_run_metadata(calibration=calibrate())
+        run_id = append_results(samples, store, metadata)
+        print(f"Appended {len(samples)} samples to {store} (run {run_id})")
     print(df)
 
+    gap = builtin_gap(df.reset_index(level="case"))
+    if not gap.empty:
+        # builtins often show a 0 MB RSS delta, so memory is compared in MB, not as a ratio
+        table = gap[gap["metric"] != "ram"].pivot_table(index=["case", "tree"],
+                                                        columns="metric", values="ratio")
+        table["ram_mb_more"] = gap[gap["metric"] == "ram"].pivot_table(
+            index=["case", "tree"], values="diff")["diff"]
+        print("\nCustom tree cost relative to the best builtin "
+              "(ratio < 1 or ram_mb_more < 0: tree wins):")
+        print(table)
+
 
 
 
@@ -85,43 +121,315 @@ def generate_sizes(hpc: bool = False,
     return list(range(step, max_n + 1, step))
 
 
-if __name__ == "__main__":
+def merge_results(paths: List[str], out: str | None, store: str | None) -> None:
+    """
+    Merge per-person wide CSVs into one file and/or import them into the
+    results store.
+    :param paths: Wide CSV files written by `run_cron_comparison`.
+    :param out: Merged CSV path (a `source` column names the input file).
+    :param store: Results store to import into, or None.
+    """
+    import pandas as pd
+    from src.benchmark.results_store import import_wide_csv, read_wide_csv
 
-    # Read command-line arguments: sys.argv[1], sys.argv[2] (optional), and sys.argv[3] (optional)
-    args = sys.argv[1:]
-    if len(args) < 1:
-        print("Usage: python main.py <True|False> [person_name] [repeat]")
-        sys.exit(1)
-
-    # 1st argument: must be "True" or "False"
-    hpc_arg = args[0].strip().lower()
-    if hpc_arg == "true":
-        on_hpc_flag = True
-    elif hpc_arg == "false":
-        on_hpc_flag = False
-    else:
-        print("Error: first argument must be True or False.")
-        sys.exit(1)
+    if out:
+        frames = []
+        for path in paths:
+            df = read_wide_csv(path)
+            df.insert(0, "source", os.path.splitext(os.path.basename(path))[0])
+            frames.append(df)
+        pd.concat(frames, ignore_index=True).to_csv(out, index=False)
+        print(f"Merged {len(paths)} file(s) into {out}")
+    if store:
+        for path in paths:
+            run_id = import_wide_csv(path, store)
+            print(f"Imported {path} into {store} (run {run_id})")
 
-    # 2nd argument: person_name (optional)
-    persona = args[1] if len(args) > 1 else None
 
-    # 3rd argument: repeat (optional, default = 2)
-    if len(args) > 2:
-        try:
-            repeat = int(args[2])
-            if repeat < 1:
-                raise ValueError
-        except ValueError:
-            print("Error: third argument [repeat] must be a positive integer.")
-            sys.exit(1)
-    else:
-        repeat = 5
+def plot_results(paths: List[str], out_dir: str) -> None:
+    """
+    Save the facet plot of each wide CSV as a PNG, without a display.
+    :param paths: Wide CSV files written by `run_cron_comparison`.
+    :param out_dir: Directory for the images.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    from src.benchmark.plot_functions import plot_facet_metrics
+    from src.benchmark.results_store import read_wide_csv
+
+    os.makedirs(out_dir, exist_ok=True)
+    for path in paths:
+        name = os.path.splitext(os.path.basename(path))[0]
+        df = read_wide_csv(path)
+        if "case" not in df.columns:
+            df["case"] = name
+        g = plot_facet_metrics(df)
+        g.figure.suptitle(f"Metrics for {name}")
+        target = os.path.join(out_dir, f"{name}.png")
+        g.savefig(target)
+        plt.close(g.figure)
+        print(f"Saved {target}")
 
-    # Generate sizes based on whether we're on HPC
-    sizes = generate_sizes(hpc=on_hpc_flag)
 
-    # Run the comparison
-    run_cron_comparison(persona, sizes, repeat)
+WORKLOADS = ("misses", "cache", "shards")
+
+
+def run_workloads(kind: str, sizes: List[int], repeat: int, cases: List[str],
+                  person_name: str | None = None,
+                  store: str | None = DEFAULT_STORE,
+                  miss_ratio: float = 0.9, fp_rate: float = 0.01,
+                  cache_size: int = 1024, zipf_s: float = 1.1,
+                  workers: List[int] = (1, 2, 4)) -> None:
+    """
+    Run one of the lookup workloads from `src.benchmark.workloads`, save it
+    to data/workloads_<kind>[_<name>].csv and append it to the results store
+    as kind "workload:<kind>", so `compare` and `fit` skip it.
+    :param kind: "misses" (Bloom filter on miss-heavy lookups), "cache"
+                 (prefix cache on Zipf searches and completions) or
+                 "shards" (ShardedTSTree scaling over worker counts).
+    :param sizes: List of dataset sizes.
+    :param repeat: Repetitions per point.
+    :param cases: Word cases to run.
+    :param person_name: Optional name to include in the filename.
+    :param store: Path of the SQLite results store, or None to skip it.
+    :param miss_ratio: Fraction of absent queries ("misses").
+    :param fp_rate: Bloom filter false-positive target ("misses").
+    :param cache_size: Prefix cache entries ("cache").
+    :param zipf_s: Query skew ("cache").
+    :param workers: Worker counts ("shards").
+    """
+    import pandas as pd
+    from src.benchmark import workloads
+
+    random.seed(100)
+    frames = []
+    for case in cases:
+        if kind == "misses":
+            specs = [(label, TREE_REGISTRY[label]) for label in ("tst", "bst")]
+            df = workloads.run_miss_comparison(sizes, specs, repeat, case,
+                                               miss_ratio=miss_ratio, fp_rate=fp_rate)
+        elif kind == "cache":
+            df = workloads.run_cache_comparison(sizes, repeat, case,
+                                                cache_size=cache_size, zipf_s=zipf_s)
+        else:
+            df = workloads.run_shard_scaling(sizes, tuple(workers), repeat, case)
+        frames.append(df)
+    df = pd.concat(frames, keys=list(cases), names=["case"])
+
+    os.makedirs("data", exist_ok=True)
+    suffix = f"_{person_name.lower()}" if person_name else ""
+    filename = f"data/workloads_{kind}{suffix}.csv"
+    df.to_csv(filename, index=True)
+    print(f"Saved results to {filename}")
+
+    if store:
+        from src.benchmark.results_store import append_results, collect_run_metadata, wide_to_long
+        rows = wide_to_long(df.reset_index(level="case"))
+        metadata = collect_run_metadata(calibration=calibrate(), kind=f"workload:{kind}")
+        run_id = append_results(rows, store, metadata)
+        print(f"Appended {len(rows)} rows to {store} (run {run_id})")
+
+
+def fit_results(paths: List[str], metrics: List[str] | None,
+                time_budget: float | None, memory_budget: float | None,
+                out: str | None, min_r2: float = 0.9,
+                max_extrapolation: float = 4.0) -> None:
+    """
+    Fit growth models to benchmark results and print the best model per
+    (tree, case, metric), the per-operation cost and, given a budget, the
+    largest size that fits it.
+    :param paths: Wide CSV files or results stores (latest benchmark run of each;
+                  workload runs are skipped).
+    :param metrics: Metrics to fit, all if None.
+    :param time_budget: Seconds allowed for the n inserts or n searches.
+    :param memory_budget: MB allowed for the tree.
+    :param out: Write every fit to this CSV if given.
+    :param min_r2: Fits below this R² are reported as poor and get no size.
+    :param max_extrapolation: Sizes beyond this multiple of the largest
+                              measured size are marked as extrapolated.
+    """
+    import pandas as pd
+    from src.benchmark.compare import load_run
+    from src.benchmark.complexity import (capacity_plan, fit_complexity,
+                                          format_fit_report, per_operation_cost)
+
+    df = pd.concat([load_run(path)[0] for path in paths], ignore_index=True)
+    fits = fit_complexity(df, metrics)
+    if fits.empty:
+        raise ValueError("no series with at least three sizes to fit")
+    plan = None
+    if time_budget is not None or memory_budget is not None:
+        plan = capacity_plan(fits, time_budget, memory_budget,
+                             min_r2=min_r2, max_extrapolation=max_extrapolation)
+    print(format_fit_report(fits, plan, min_r2))
+
+    cost = per_operation_cost(df if metrics is None else df[df["metric"].isin(metrics)])
+    largest = cost[cost["size"] == cost.groupby(["tree", "case"])["size"].transform("max")]
+    print("\nPer-operation cost at the largest size (seconds or MB per key, and per character):")
+    if (largest["key_len_source"] == "estimated").any():
+        print("(key_len 'estimated': not recorded in these results, derived from the case; "
+              "per_char is approximate)")
+    print(largest[["tree", "case", "metric", "size", "key_len", "key_len_source",
+                   "per_op", "per_char"]]
+          .sort_values(["metric", "case", "tree"])
+          .to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+    if out:
+        fits.to_csv(out, index=False)
+        print(f"Saved fits to {out}")
+
+
+def _positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError("must be a positive integer")
+    return number
+
+
+def _csv_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """
+    Command-line interface: run, workloads, merge, plot, fit and compare.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark TSTree, Btree and friends.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run = sub.add_parser("run", help="run a benchmark sweep")
+    run.add_argument("--hpc", action="store_true",
+                     help="default sizes up to 50,000 instead of 5,000")
+    run.add_argument("--sizes", type=lambda v: [int(x) for x in _csv_list(v)],
+                     help="comma-separated sizes, e.g. 1000,2000,4000")
+    run.add_argument("--max-n", type=_positive_int, help="largest size (default by --hpc)")
+    run.add_argument("--step", type=_positive_int, help="size increment (default max_n // 10)")
+    run.add_argument("--cases", type=_csv_list, default=list(DEFAULT_CASES),
+                     help="comma-separated cases: best,worst,average,corpus:<path>,... "
+                          "(corpus words are shuffled, not kept in file order)")
+    run.add_argument("--trees", type=_csv_list, default=None,
+                     help=f"comma-separated trees from {','.join(TREE_REGISTRY)} (default all)")
+    run.add_argument("--repeat", type=_positive_int, default=5, help="repetitions (default 5)")
+    run.add_argument("--name", help="person name for data/df_<name>.csv")
+    run.add_argument("--store", default=DEFAULT_STORE,
+                     help=f"results store (default {DEFAULT_STORE})")
+    run.add_argument("--no-store", action="store_true", help="do not write the results store")
+    run.add_argument("--profile", metavar="DIR",
+                     help="write cProfile, flame-graph and tracemalloc output here")
+
+    work = sub.add_parser("workloads", help="run the Bloom filter, prefix cache or sharding benchmark")
+    work.add_argument("kind", choices=WORKLOADS,
+                      help="misses: Bloom filter on miss-heavy lookups; cache: prefix cache "
+                           "on skewed queries; shards: ShardedTSTree over worker counts")
+    work.add_argument("--hpc", action="store_true",
+                      help="default sizes up to 50,000 instead of 5,000")
+    work.add_argument("--sizes", type=lambda v: [int(x) for x in _csv_list(v)],
+                      help="comma-separated sizes, e.g. 1000,2000,4000")
+    work.add_argument("--max-n", type=_positive_int, help="largest size (default by --hpc)")
+    work.add_argument("--step", type=_positive_int, help="size increment (default max_n // 10)")
+    work.add_argument("--cases", type=_csv_list, default=["average"],
+                      help="comma-separated cases (default average)")
+    work.add_argument("--repeat", type=_positive_int, default=3, help="repetitions (default 3)")
+    work.add_argument("--name", help="person name for data/workloads_<kind>_<name>.csv")
+    work.add_argument("--store", default=DEFAULT_STORE,
+                      help=f"results store (default {DEFAULT_STORE})")
+    work.add_argument("--no-store", action="store_true", help="do not write the results store")
+    work.add_argument("--miss-ratio", type=float, default=0.9,
+                      help="misses: fraction of absent queries (default 0.9)")
+    work.add_argument("--fp-rate", type=float, default=0.01,
+                      help="misses: Bloom filter false-positive target (default 0.01)")
+    work.add_argument("--cache-size", type=_positive_int, default=1024,
+                      help="cache: prefix cache entries (default 1024)")
+    work.add_argument("--zipf-s", type=float, default=1.1,
+                      help="cache: query skew, larger is hotter (default 1.1)")
+    work.add_argument("--workers", type=lambda v: [_positive_int(x) for x in _csv_list(v)],
+                      default=[1, 2, 4], help="shards: comma-separated worker counts (default 1,2,4)")
+
+    merge = sub.add_parser("merge", help="merge per-person CSVs")
+    merge.add_argument("paths", nargs="+", help="wide CSV files")
+    merge.add_argument("--out", default="data/df_merged.csv", help="merged CSV path")
+    merge.add_argument("--store", help="also import the files into this results store")
+
+    plot = sub.add_parser("plot", help="save facet plots of CSV results as PNG")
+    plot.add_argument("paths", nargs="+", help="wide CSV files")
+    plot.add_argument("--out-dir", default="plots", help="output directory (default plots)")
+
+    fit = sub.add_parser("fit", help="fit growth models and plan capacity from results")
+    fit.add_argument("paths", nargs="+", help="wide CSV files or results stores")
+    fit.add_argument("--metrics", type=_csv_list, help="comma-separated metrics (default all)")
+    fit.add_argument("--time-budget", type=float, metavar="SECONDS",
+                     help="report the largest size whose n inserts/searches fit this")
+    fit.add_argument("--memory-budget", type=float, metavar="MB",
+                     help="report the largest size whose tree fits this")
+    fit.add_argument("--min-r2", type=float, default=0.9,
+                     help="fits below this R² get no capacity estimate (default 0.9)")
+    fit.add_argument("--max-extrapolation", type=float, default=4.0,
+                     help="flag sizes beyond this multiple of the largest measured one (default 4)")
+    fit.add_argument("--out", help="write all fits to this CSV")
+
+    # options are parsed by src.benchmark.compare, so its pandas import stays lazy
+    sub.add_parser("compare", add_help=False,
+                   help="regression gate against a baseline (see compare -h)")
+    return parser
+
+
+def main(argv: List[str] | None = None) -> int:
+    """
+    Entry point; returns the process exit code.
+    """
+    argv = sys.argv[1:] if argv is None else argv
+
+    # old form: python main.py <True|False> [person_name] [repeat] [profile_dir]
+    if argv and argv[0].lower() in ("true", "false"):
+        legacy = ["run", "--repeat", argv[2] if len(argv) > 2 else "5"]
+        if argv[0].lower() == "true":
+            legacy.append("--hpc")
+        if len(argv) > 1:
+            legacy += ["--name", argv[1]]
+        if len(argv) > 3:
+            legacy += ["--profile", argv[3]]
+        argv = legacy
+
+    # compare parses its own options (REMAINDER would swallow a leading -h)
+    if argv and argv[0] == "compare":
+        from src.benchmark.compare import main as compare_main
+        return compare_main(argv[1:])
+
+    args = build_parser().parse_args(argv)
+
+    if args.command == "merge":
+        merge_results(args.paths, args.out, args.store)
+        return 0
+
+    if args.command == "plot":
+        plot_results(args.paths, args.out_dir)
+        return 0
+
+    if args.command == "workloads":
+        sizes = args.sizes or generate_sizes(hpc=args.hpc, max_n=args.max_n, step=args.step)
+        run_workloads(args.kind, sizes, args.repeat, args.cases, args.name,
+                      store=None if args.no_store else args.store,
+                      miss_ratio=args.miss_ratio, fp_rate=args.fp_rate,
+                      cache_size=args.cache_size, zipf_s=args.zipf_s, workers=args.workers)
+        return 0
+
+    if args.command == "fit":
+        try:
+            fit_results(args.paths, args.metrics, args.time_budget, args.memory_budget, args.out,
+                        args.min_r2, args.max_extrapolation)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 2
+        return 0
+
+    sizes = args.sizes or generate_sizes(hpc=args.hpc, max_n=args.max_n, step=args.step)
+    run_cron_comparison(args.name, sizes, args.repeat,
+                        store=None if args.no_store else args.store,
+                        trees=args.trees, profile_dir=args.profile, cases=args.cases)
     print("Finished run_cron_comparison() and saved results.")
+    return 0
 
+
+if __name__ == "__main__":
+    sys.exit(main())
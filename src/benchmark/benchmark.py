@@ -1,21 +1,26 @@
 # Benchmarking script for HPC performance tests
+# Only the standard library and psutil are imported here, so tree and
+# measurement code starts fast in SLURM tasks and worker processes;
+# pandas is imported when results are turned into a DataFrame.
 import psutil
 import os
 import random
 import string
 import time
-import pandas as pd
 from collections import defaultdict
-import seaborn as sns
-import matplotlib.pyplot as plt
-from typing import List, Literal
+from typing import TYPE_CHECKING, List, Literal
+
+from src.benchmark.corpus import load_corpus, parse_corpus_case
+
+if TYPE_CHECKING:
+    import pandas as pd
 
 
 Case = Literal["average", "best", "worst"]
 
-def _random_word(length: int) -> str:
+def _random_word(length: int, rng=random) -> str:
     """Return one random lowercase word of the given length."""
-    return "".join(random.choices(string.ascii_lowercase, k=length))
+    return "".join(rng.choices(string.ascii_lowercase, k=length))
 
 
 def _tst_worst_chain(n: int) -> List[str]:
@@ -25,11 +30,11 @@ def _tst_worst_chain(n: int) -> List[str]:
     The tree becomes a single '=' chain of depth ≈ n.
     """
     return ["a" * i for i in range(1, n + 1)]
-print("Worst-case TST chain generated:", _tst_worst_chain(5))
 
 def _tst_best_common_prefix(n: int,
                             prefix: str = "app",
-                            suffix_len: int = 4) -> List[str]:
+                            suffix_len: int = 4,
+                            rng=random) -> List[str]:
     """
     Best-case for a TST: many strings share a *long common prefix*.
     Every word is  <prefix> + random suffix.
@@ -38,7 +43,7 @@ def _tst_best_common_prefix(n: int,
     """
     seen = set()
     while len(seen) < n:
-        suffix = _random_word(suffix_len)
+        suffix = _random_word(suffix_len, rng)
         seen.add(prefix + suffix)
     return list(seen)
 
@@ -59,28 +64,48 @@ def generate_words(n: int,
     """
     Produce a list of *unique* words tailored to the chosen case.
 
-    - average : fully random words of length k (or 2–20 if k is None), shuffled.
+    - average : fully random words of length k (or 2–20 if k is None), shuffled;
+                the length grows if it is too short for n unique words.
     - best    : words that all share a long common prefix (good for TST).
     - worst   : 'a', 'aa', 'aaa', … — forces a degenerate '=' chain.
+    - corpus:<path>      : first n unique words of a word list (plain or .gz).
+    - corpus-text:<path> : first n unique tokens of a running-text file.
+
+    Words come from a private RNG seeded with `seed`, or with the case and
+    n when `seed` is None, so the same (case, n) always gives the same
+    words whatever ran before; runs on different machines or with some
+    sizes skipped stay comparable.
+
+    Corpus words are shuffled, because word lists are usually sorted and
+    sorted inserts turn `Btree` into a linked list: the benchmark would
+    measure the file order rather than the vocabulary.
     """
-    if seed is not None:
-        random.seed(seed)
+    rng = random.Random(seed if seed is not None else f"{case}:{n}")
+
+    corpus = parse_corpus_case(case)
+    if corpus is not None:
+        path, tokenise = corpus
+        words = load_corpus(path, n, tokenise=tokenise)
+        rng.shuffle(words)
+        return words
 
     if case == "worst":
         return _tst_worst_chain(n)
 
     if case == "best":
         
-        words = _tst_best_common_prefix(n, prefix="app", suffix_len=4)
+        words = _tst_best_common_prefix(n, prefix="app", suffix_len=4, rng=rng)
         return _median_order(sorted(words))
 
     # 
-    word_len = k if k is not None else random.randint(2, 20)
+    word_len = k if k is not None else rng.randint(2, 20)
+    while 26 ** word_len < 2 * n:      # short lengths cannot yield n unique words
+        word_len += 1
     pool = set()
     while len(pool) < n:
-        pool.add(_random_word(word_len))
-    words = list(pool)
-    random.shuffle(words)
+        pool.add(_random_word(word_len, rng))
+    words = sorted(pool)           # set order depends on the per-process str hash
+    rng.shuffle(words)
     return words
 
 
@@ -94,18 +119,45 @@ def get_ram_usage_mb():
     return mem
 
 
-def benchmark_tree(TreeClass, words, repeat=50):
+METRICS = ("insert", "search", "ram")
+
+
+def calibrate(repeat: int = 5) -> float:
     """
-    Benchmark the insert and search operations of a tree data structure.
+    Time a fixed pure-Python workload (string building, dict and sort) to
+    measure how fast this machine runs interpreter-bound code.
+    Timings from two machines can be compared after dividing by their
+    calibration values.
+    :param repeat: Number of runs; the fastest one is kept
+    :return: Best wall time of the workload in seconds
+    """
+    rng = random.Random(12345)
+    keys = ["".join(rng.choices(string.ascii_lowercase, k=8)) for _ in range(20_000)]
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        table = {}
+        for i, key in enumerate(keys):
+            table[key + "x"] = i
+        ordered = sorted(table)
+        sum(1 for key in ordered if key[0] < "m")
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def benchmark_tree_samples(TreeClass, words, repeat=50):
+    """
+    Benchmark the insert and search operations of a tree data structure,
+    keeping every repetition.
+    Structures that are built once and then frozen may define `finalize()`;
+    it is called at the end of the insert phase and timed with it.
     :param TreeClass: The tree class to be benchmarked
     :param words: List of words to insert and search
     :param repeat: Number of times to repeat the benchmark
-    :return: Average insert time, average search time, and average memory usage
+    :return: Dict mapping "insert", "search" and "ram" to one value per repeat
     """
 
-    insert_times = []
-    search_times = []
-    memory_usages = []
+    samples = {metric: [] for metric in METRICS}
 
     for _ in range(repeat):
         # Measure memory before building tree
@@ -117,11 +169,13 @@ def benchmark_tree(TreeClass, words, repeat=50):
         start = time.perf_counter()
         for word in words:
             tree.insert(word)
+        if hasattr(tree, "finalize"):
+            tree.finalize()
         insert_duration = time.perf_counter() - start
 
         # Measure memory after building tree
         mem_after = get_ram_usage_mb()
-        memory_usages.append(max(0, mem_after - mem_before))
+        samples["ram"].append(max(0, mem_after - mem_before))
 
         # Search benchmark
         start = time.perf_counter()
@@ -129,12 +183,24 @@ def benchmark_tree(TreeClass, words, repeat=50):
             tree.search(word)
         search_duration = time.perf_counter() - start
 
-        insert_times.append(insert_duration)
-        search_times.append(search_duration)
+        samples["insert"].append(insert_duration)
+        samples["search"].append(search_duration)
+
+    return samples
+
 
-    avg_insert = sum(insert_times) / repeat
-    avg_search = sum(search_times) / repeat
-    avg_memory = sum(memory_usages) / repeat
+def benchmark_tree(TreeClass, words, repeat=50):
+    """
+    Benchmark the insert and search operations of a tree data structure.
+    :param TreeClass: The tree class to be benchmarked
+    :param words: List of words to insert and search
+    :param repeat: Number of times to repeat the benchmark
+    :return: Average insert time, average search time, and average memory usage
+    """
+    samples = benchmark_tree_samples(TreeClass, words, repeat)
+    avg_insert = sum(samples["insert"]) / repeat
+    avg_search = sum(samples["search"]) / repeat
+    avg_memory = sum(samples["ram"]) / repeat
     return avg_insert, avg_search, avg_memory
 
 
@@ -144,8 +210,11 @@ def run_comparison(
         repeat: int = 3,
         case: str = "average",
         *,
-        verbose: bool = True
-) -> pd.DataFrame:
+        verbose: bool = True,
+        samples: list | None = None,
+        profile_dir: str | None = None,
+        sample_interval: float | None = 0.001
+) -> "pd.DataFrame":
     """
     Benchmark multiple tree classes on the same word lists.
 
@@ -155,25 +224,37 @@ def run_comparison(
     tree_specs : list of (label, TreeClass) tuples, e.g.
                  [("tst", TSTree), ("bst", Btree)]
     repeat     : repetitions passed straight to `benchmark_tree`
-    case       : "average" | "best" | "worst"
+    case       : "average" | "best" | "worst" | "corpus:<path>"
+                 | "corpus-text:<path>"
     verbose    : print progress if True
+    samples    : optional list; if given, one long-format dict per repetition
+                 is appended to it with keys tree, case, size, metric,
+                 sample, value and key_len (see `src.benchmark.results_store`)
+    profile_dir: if given, every (tree, case, size) gets one extra untimed
+                 pass under cProfile, a stack sampler and tracemalloc,
+                 written to this directory (see `src.benchmark.profiling`)
+    sample_interval : seconds between stack samples when profiling;
+                 None disables the sampler
 
     Returns
     -------
-    pd.DataFrame in wide format — one row per `size`,
-    columns "<label>_<metric>" for metric in {insert, search, ram}.
+    pd.DataFrame in wide format — one row per `size`, a "key_len" column
+    (mean characters per word of that size) and columns "<label>_<metric>"
+    for metric in {insert, search, ram}.
     """
     # build an empty dict-of-lists with dynamic keys ---------------
     results = defaultdict(list)
     results["size"] = []           # always present
+    results["key_len"] = []
 
     for label, _ in tree_specs:
-        for metric in ("insert", "search", "ram"):
+        for metric in METRICS:
             results[f"{label}_{metric}"] = []
 
     # --------------------------------------------------------------
     for size in sizes:
         words = generate_words(size, case=case)
+        key_len = sum(map(len, words)) / len(words) if words else 0.0
 
         if verbose:
             print(f"\nBenchmarking {size} words ({case} case)…")
@@ -181,18 +262,33 @@ def run_comparison(
         row_metrics = {}         
 
         for label, TreeClass in tree_specs:
-            ins, srch, ram = benchmark_tree(TreeClass, words, repeat)
+            tree_samples = benchmark_tree_samples(TreeClass, words, repeat)
+            ins, srch, ram = (sum(tree_samples[m]) / repeat for m in METRICS)
             results[f"{label}_insert"].append(ins)
             results[f"{label}_search"].append(srch)
             results[f"{label}_ram"].append(ram)
 
             row_metrics[label] = (ins, srch, ram)
 
+            if profile_dir is not None:
+                from src.benchmark.profiling import profile_tree
+                profile_tree(TreeClass, words, profile_dir, f"{label}_{case}_{size}",
+                             sample_interval)
+
+            if samples is not None:
+                for metric in METRICS:
+                    for i, value in enumerate(tree_samples[metric]):
+                        samples.append({"tree": label, "case": case, "size": size,
+                                        "metric": metric, "sample": i, "value": value,
+                                        "key_len": key_len})
+
         results["size"].append(size)
+        results["key_len"].append(key_len)
 
         if verbose:
             for label, (ins, srch, ram) in row_metrics.items():
                 print(f"{label:<8}| ins {ins:.4f}s | srch {srch:.4f}s | ram {ram:.2f} MB")
 
+    import pandas as pd
     return pd.DataFrame(results)
 
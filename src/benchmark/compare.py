@@ -0,0 +1,234 @@
+# Performance regression gate: compare a fresh run against a baseline
+import argparse
+import math
+import random
+import sys
+
+import pandas as pd
+
+from src.benchmark.benchmark import calibrate, run_comparison
+from src.benchmark.results_store import (BENCHMARK_KIND, load_results, read_wide_csv,
+                                         wide_to_long)
+
+
+TIME_METRICS = ("insert", "search")
+
+
+def load_run(path: str, run_id: str | None = None) -> tuple[pd.DataFrame, float | None]:
+    """
+    Load one benchmark run in long format.
+
+    - `.csv`            : a wide CSV as written by `run_cron_comparison`
+                          (one averaged sample per point, no calibration).
+    - `.sqlite` / `.db` : a results store; `run_id` picks the run, the most
+                          recent benchmark run (not a workload run) is
+                          used when it is None.
+
+    :param path: Path to the CSV file or results store.
+    :param run_id: Run to load from a store.
+    :return: (DataFrame with tree, case, size, metric, sample, value;
+              calibration of the run or None if unknown)
+    """
+    if path.endswith((".sqlite", ".db")):
+        df = load_results(path) if run_id is None else load_results(path, run_id=run_id)
+        if run_id is None and "kind" in df.columns:
+            df = df[df["kind"].isna() | (df["kind"] == BENCHMARK_KIND)]
+        if df.empty:
+            raise ValueError(f"no benchmark results found in {path}")
+        if run_id is None:
+            latest = df.sort_values("timestamp", na_position="first")["run_id"].iloc[-1]
+            df = df[df["run_id"] == latest]
+        calibration = df["calibration"].dropna()
+        return df, (float(calibration.iloc[0]) if len(calibration) else None)
+
+    return pd.DataFrame(wide_to_long(read_wide_csv(path))), None
+
+
+def fresh_run(baseline: pd.DataFrame,
+              tree_specs: list[tuple[str, type]],
+              repeat: int = 3,
+              max_size: int | None = None) -> pd.DataFrame:
+    """
+    Re-run `run_comparison` on the sizes and cases found in a baseline.
+    :param baseline: Long-format baseline from `load_run`.
+    :param tree_specs: (label, TreeClass) pairs to benchmark.
+    :param repeat: Repetitions per point.
+    :param max_size: Skip baseline sizes above this.
+    :return: Long-format DataFrame of the new samples.
+    """
+    sizes = sorted(int(s) for s in baseline["size"].unique())
+    if max_size is not None:
+        sizes = [s for s in sizes if s <= max_size]
+    if not sizes:
+        raise ValueError("no baseline sizes left to run")
+
+    labels = set(baseline["tree"])
+    specs = [(label, cls) for label, cls in tree_specs if label in labels]
+    samples = []
+    random.seed(100)               # as run_cron_comparison; words are seeded per (case, size)
+    for case in baseline["case"].unique():
+        run_comparison(sizes, specs, repeat=repeat, case=case, verbose=False, samples=samples)
+    return pd.DataFrame(samples)
+
+
+def match_key_lengths(baseline: pd.DataFrame,
+                      candidate: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame, list[str]]:
+    """
+    Drop (case, size) points whose mean key length differs between the two
+    runs, since timings of different words are not comparable.
+    :param baseline: Long-format baseline from `load_run`.
+    :param candidate: Long-format candidate.
+    :return: (baseline, candidate, warnings); the frames are unchanged when
+             either run did not record key_len, which is then warned about.
+    """
+    def _lengths(df):
+        if "key_len" not in df.columns:
+            return None
+        lengths = df.groupby(["case", "size"])["key_len"].mean()
+        return None if lengths.isna().all() else lengths
+
+    base_len, cand_len = _lengths(baseline), _lengths(candidate)
+    if base_len is None or cand_len is None:
+        missing = "baseline" if base_len is None else "candidate"
+        return baseline, candidate, [f"Warning: the {missing} did not record key_len; "
+                                     "points cannot be checked for matching words."]
+
+    both = pd.concat([base_len, cand_len], axis=1, keys=["base", "cand"]).dropna()
+    differ = both[(both["base"] - both["cand"]).abs() > 1e-9]
+    if differ.empty:
+        return baseline, candidate, []
+
+    skip = set(differ.index)
+    keep = lambda df: df[[(c, s) not in skip for c, s in zip(df["case"], df["size"])]]
+    warnings = [f"Warning: skipped {case}/{size}: key length {row.base:.3g} in the baseline, "
+                f"{row.cand:.3g} in the candidate." for (case, size), row in differ.iterrows()]
+    return keep(baseline), keep(candidate), warnings
+
+
+def compare_runs(baseline: pd.DataFrame,
+                 candidate: pd.DataFrame,
+                 *,
+                 threshold: float = 0.10,
+                 z: float = 2.0,
+                 speed_factor: float = 1.0,
+                 metrics=TIME_METRICS) -> pd.DataFrame:
+    """
+    Compare two long-format runs point by point.
+
+    Candidate timings are divided by `speed_factor` (candidate calibration
+    over baseline calibration) so a slower machine is not reported as a
+    regression. A point is flagged when the normalised candidate mean is
+    more than `threshold` slower than the baseline *and*, where both runs
+    recorded several samples, the difference exceeds `z` standard errors.
+
+    :param baseline: Long DataFrame with tree, case, size, metric, value.
+    :param candidate: Same layout as `baseline`.
+    :param threshold: Allowed relative slowdown, e.g. 0.10 for 10 %.
+    :param z: Number of standard errors the slowdown must exceed.
+    :param speed_factor: Candidate / baseline machine speed ratio.
+    :param metrics: Metrics to compare.
+    :return: One row per common (tree, case, size, metric) with baseline,
+             candidate, ratio and regression columns.
+    """
+    key = ["tree", "case", "size", "metric"]
+
+    def _stats(df):
+        df = df[df["metric"].isin(metrics)]
+        return df.groupby(key)["value"].agg(["mean", "std", "count"]).reset_index()
+
+    cand = candidate.copy()
+    is_time = cand["metric"].isin(TIME_METRICS)
+    cand.loc[is_time, "value"] = cand.loc[is_time, "value"] / speed_factor
+
+    merged = _stats(baseline).merge(_stats(cand), on=key, suffixes=("_base", "_cand"))
+    if merged.empty:
+        raise ValueError("baseline and candidate have no (tree, case, size, metric) in common")
+
+    def _noise(row):
+        parts = [row[f"std_{s}"] ** 2 / row[f"count_{s}"]
+                 for s in ("base", "cand")
+                 if row[f"count_{s}"] > 1 and not math.isnan(row[f"std_{s}"])]
+        return math.sqrt(sum(parts)) if len(parts) == 2 else 0.0
+
+    merged["baseline"] = merged["mean_base"]
+    merged["candidate"] = merged["mean_cand"]
+    merged["ratio"] = merged["candidate"] / merged["baseline"].where(merged["baseline"] > 0)
+    merged["noise"] = merged.apply(_noise, axis=1)
+    merged["regression"] = ((merged["ratio"] > 1 + threshold)
+                            & (merged["candidate"] - merged["baseline"] > z * merged["noise"]))
+    return merged[key + ["baseline", "candidate", "ratio", "noise", "regression"]]
+
+
+def format_report(result: pd.DataFrame, threshold: float, speed_factor: float) -> str:
+    """
+    Render a comparison as a short text report, worst slowdowns first.
+    """
+    flagged = result[result["regression"]].sort_values("ratio", ascending=False)
+    lines = [f"Compared {len(result)} points "
+             f"(threshold +{threshold:.0%}, machine speed factor {speed_factor:.3f})"]
+    if flagged.empty:
+        lines.append("No regressions found.")
+    else:
+        lines.append(f"{len(flagged)} regression(s):")
+        lines.append(flagged.to_string(index=False, float_format=lambda v: f"{v:.6g}"))
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """
+    Command-line entry point; returns 1 when a regression is found.
+    """
+    parser = argparse.ArgumentParser(prog="main.py compare",
+                                     description="Compare a benchmark run against a baseline.")
+    parser.add_argument("baseline", help="baseline CSV or results store")
+    parser.add_argument("candidate", nargs="?",
+                        help="candidate CSV or results store; omitted = run a fresh sweep now")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed relative slowdown (default 0.10)")
+    parser.add_argument("--z", type=float, default=2.0,
+                        help="standard errors a slowdown must exceed (default 2)")
+    parser.add_argument("--metrics", default=",".join(TIME_METRICS),
+                        help="comma-separated metrics to compare (default insert,search)")
+    parser.add_argument("--baseline-calibration", type=float,
+                        help="calibration of the baseline machine, for CSV baselines")
+    parser.add_argument("--candidate-calibration", type=float,
+                        help="calibration of the candidate machine")
+    parser.add_argument("--repeat", type=int, default=3, help="repetitions for a fresh run")
+    parser.add_argument("--max-size", type=int, help="largest size for a fresh run")
+    args = parser.parse_args(argv)
+
+    baseline, base_cal = load_run(args.baseline)
+    base_cal = args.baseline_calibration or base_cal
+
+    if args.candidate:
+        candidate, cand_cal = load_run(args.candidate)
+    else:
+        from src.benchmark.registry import get_tree_specs
+        candidate = fresh_run(baseline, get_tree_specs(),
+                              repeat=args.repeat, max_size=args.max_size)
+        cand_cal = calibrate()
+    cand_cal = args.candidate_calibration or cand_cal
+
+    if base_cal and cand_cal:
+        speed_factor = cand_cal / base_cal
+    else:
+        speed_factor = 1.0
+        print("Warning: calibration missing for one run; timings are compared unnormalised.")
+
+    baseline, candidate, warnings = match_key_lengths(baseline, candidate)
+    for warning in warnings:
+        print(warning)
+
+    try:
+        result = compare_runs(baseline, candidate, threshold=args.threshold, z=args.z,
+                              speed_factor=speed_factor, metrics=tuple(args.metrics.split(",")))
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 2
+    print(format_report(result, args.threshold, speed_factor))
+    return 1 if result["regression"].any() else 0
+
+
+if __name__ == "__main__":
+    sys.setrecursionlimit(100_000)
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# Empirical complexity fits and capacity planning from benchmark sweeps
+import math
+from typing import TYPE_CHECKING, Callable, Dict, Iterable
+
+import numpy as np
+
+from src.benchmark.corpus import load_corpus, parse_corpus_case
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+# Candidate growth models f(n), fitted as value = a * f(n). The benchmark
+# metrics are totals over n operations (and total RAM for n keys), so they
+# vanish at n = 0 and the fit goes through the origin; a total growing as
+# "n log n" means O(log n) per operation.
+MODELS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "log n": np.log,
+    "n": lambda n: n,
+    "n log n": lambda n: n * np.log(n),
+    "n^2": lambda n: n ** 2,
+}
+
+PER_OPERATION = {"log n": "log n / n", "n": "1", "n log n": "log n", "n^2": "n"}
+
+# mean key length of the synthetic cases of `generate_words`, for legacy
+# results without a recorded key_len
+_BEST_KEY_LEN = len("app") + 4
+_AVERAGE_KEY_LEN = (2 + 20) / 2        # expectation: one random length in 2..20 per sweep point
+
+# capacity estimates are flagged below this R² or this far past the
+# largest measured size
+MIN_R2 = 0.9
+MAX_EXTRAPOLATION = 4.0
+
+
+def fit_series(sizes: Iterable[float], values: Iterable[float]) -> list[dict]:
+    """
+    Least-squares fit of value = a * f(n), through the origin, for every
+    model in `MODELS`. A free intercept lets the fit trade slope for a
+    constant that the totals do not have (seconds for a single insert, or
+    a negative time), which wrecks extrapolation.
+    :param sizes: Input sizes n.
+    :param values: Measured values, one per size.
+    :return: One dict per model with keys model, a and r2 (computed about
+             the mean, so it can be negative for a bad model; NaN when the
+             values are constant).
+    """
+    n = np.asarray(list(sizes), dtype=float)
+    y = np.asarray(list(values), dtype=float)
+    if len(n) < 3:
+        raise ValueError("need at least three sizes to fit a growth model")
+
+    ss_tot = float(((y - y.mean()) ** 2).sum())
+    fits = []
+    for name, f in MODELS.items():
+        design = f(n)[:, None]
+        (a,), *_ = np.linalg.lstsq(design, y, rcond=None)
+        ss_res = float(((y - a * design[:, 0]) ** 2).sum())
+        r2 = 1 - ss_res / ss_tot if ss_tot > 0 else math.nan
+        fits.append({"model": name, "a": float(a), "r2": r2})
+    return fits
+
+
+def fit_complexity(df: "pd.DataFrame", metrics: Iterable[str] | None = None) -> "pd.DataFrame":
+    """
+    Fit every (tree, case, metric) series of a long-format result frame.
+
+    Parameters
+    ----------
+    df      : long DataFrame with tree, case, size, metric, value columns
+              (e.g. from `load_results` or `compare.load_run`); samples of
+              one point are averaged before fitting
+    metrics : metrics to fit, all if None
+
+    Returns
+    -------
+    pd.DataFrame with tree, case, metric, model, a, r2, per_op (growth
+    per operation implied by the model), points, max_fitted (largest
+    measured size) and best (True for the model with the highest R² of its
+    series; ties go to the slower-growing model). Series with fewer than
+    three sizes or a constant value (e.g. RAM below the RSS resolution) are
+    skipped.
+    """
+    import pandas as pd
+
+    if metrics is not None:
+        df = df[df["metric"].isin(list(metrics))]
+    points = df.groupby(["tree", "case", "metric", "size"], as_index=False)["value"].mean()
+
+    rows = []
+    for (tree, case, metric), series in points.groupby(["tree", "case", "metric"]):
+        if series["size"].nunique() < 3 or series["value"].nunique() < 2:
+            continue
+        fits = fit_series(series["size"], series["value"])
+        best = max(range(len(fits)),
+                   key=lambda i: (-math.inf if math.isnan(fits[i]["r2"]) else fits[i]["r2"], -i))
+        for i, fit in enumerate(fits):
+            rows.append({"tree": tree, "case": case, "metric": metric, **fit,
+                         "per_op": PER_OPERATION[fit["model"]],
+                         "points": len(series), "max_fitted": int(series["size"].max()),
+                         "best": i == best})
+    return pd.DataFrame(rows)
+
+
+def mean_key_length(case: str, size: int) -> float:
+    """
+    Estimated mean key length of the words `generate_words` produces for a
+    case, for results recorded before `run_comparison` stored `key_len`.
+    The worst and best cases are exact and corpus cases are read; the
+    average case draws one random length in 2..20 per call, so only its
+    expectation is known and a single point may be off by up to ~5x.
+    :param case: Word case, e.g. "average" or "corpus:<path>".
+    :param size: Number of words.
+    :return: Mean characters per key.
+    """
+    corpus = parse_corpus_case(case)
+    if corpus is not None:
+        path, tokenise = corpus
+        words = load_corpus(path, size, tokenise=tokenise)
+        return sum(map(len, words)) / len(words) if words else math.nan
+    if case == "worst":
+        return (size + 1) / 2          # 'a', 'aa', ..., 'a' * size
+    if case == "best":
+        return _BEST_KEY_LEN
+    return _AVERAGE_KEY_LEN
+
+
+def per_operation_cost(df: "pd.DataFrame") -> "pd.DataFrame":
+    """
+    Normalise each (tree, case, size, metric) point by size and key length.
+
+    The key length recorded by `run_comparison` (`key_len`) is used where
+    present; points without it (legacy CSVs) fall back to
+    `mean_key_length` and are marked as estimates.
+
+    Parameters
+    ----------
+    df : long DataFrame with tree, case, size, metric, value and
+         optionally key_len columns
+
+    Returns
+    -------
+    pd.DataFrame with tree, case, size, metric, value (mean of the
+    samples), key_len, key_len_source ("measured" or "estimated"), per_op
+    (value / size: seconds per operation, or MB per key for "ram") and
+    per_char (per_op / key_len).
+    """
+    keys = ["tree", "case", "size", "metric"]
+    if "key_len" not in df.columns:
+        df = df.assign(key_len=math.nan)
+    out = df.groupby(keys, as_index=False).agg(value=("value", "mean"),
+                                               key_len=("key_len", "mean"))
+    measured = out["key_len"].notna()
+    estimates = {(case, size): mean_key_length(case, int(size))
+                 for case, size in out.loc[~measured, ["case", "size"]]
+                 .drop_duplicates().itertuples(index=False)}
+    out.loc[~measured, "key_len"] = [estimates[(case, size)] for case, size
+                                     in zip(out.loc[~measured, "case"], out.loc[~measured, "size"])]
+    out["key_len_source"] = np.where(measured, "measured", "estimated")
+    out["per_op"] = out["value"] / out["size"]
+    out["per_char"] = out["per_op"] / out["key_len"]
+    return out
+
+
+def max_size_within(model: str, a: float, budget: float,
+                    limit: int = 10 ** 12) -> float:
+    """
+    Largest n with a * f(n) <= budget under a fitted model.
+    :param model: Key of `MODELS`.
+    :param a: Fitted slope.
+    :param budget: Seconds or MB available.
+    :param limit: Upper end of the search; returned when the fit never
+                  reaches the budget below it.
+    :return: The size, 0 if even n = 1 is over budget, or inf for a
+             non-increasing fit.
+    """
+    f = MODELS[model]
+    if a <= 0:
+        return math.inf
+    if a * f(1.0) > budget:
+        return 0
+    if a * f(float(limit)) <= budget:
+        return limit
+
+    lo, hi = 1, limit          # f is increasing for n >= 1: bisect on the integer n
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a * f(float(mid)) <= budget:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+def capacity_plan(fits: "pd.DataFrame",
+                  time_budget: float | None = None,
+                  memory_budget: float | None = None,
+                  *,
+                  min_r2: float = MIN_R2,
+                  max_extrapolation: float = MAX_EXTRAPOLATION) -> "pd.DataFrame":
+    """
+    Extrapolate, from the best model of each series, the largest size
+    whose insert/search time fits `time_budget` seconds and whose RAM fits
+    `memory_budget` MB.
+
+    Series whose best R² is below `min_r2` get no size (NaN) and a "poor
+    fit" note; sizes more than `max_extrapolation` times the largest
+    measured size are kept but noted as extrapolated.
+
+    :param fits: Output of `fit_complexity`.
+    :param time_budget: Seconds for all n operations of one phase, or None.
+    :param memory_budget: MB for the whole tree, or None.
+    :param min_r2: Smallest R² trusted for a capacity estimate.
+    :param max_extrapolation: Largest trusted max_size / max_fitted ratio.
+    :return: DataFrame with tree, case, metric, model, r2, budget, max_size,
+             max_fitted (largest measured size) and note.
+    """
+    import pandas as pd
+
+    rows = []
+    for fit in fits[fits["best"]].itertuples(index=False):
+        budget = memory_budget if fit.metric == "ram" else time_budget
+        if budget is None:
+            continue
+        max_size, note = math.nan, ""
+        if not fit.r2 >= min_r2:
+            note = f"poor fit (R² {fit.r2:.2f} < {min_r2:g})"
+        else:
+            max_size = max_size_within(fit.model, fit.a, budget)
+            if math.isinf(max_size):
+                note = "fit does not grow"
+            elif max_size > max_extrapolation * fit.max_fitted:
+                note = f"extrapolated {max_size / fit.max_fitted:.0f}x past measured sizes"
+        rows.append({"tree": fit.tree, "case": fit.case, "metric": fit.metric,
+                     "model": fit.model, "r2": fit.r2, "budget": budget,
+                     "max_size": max_size, "max_fitted": fit.max_fitted, "note": note})
+    return pd.DataFrame(rows, columns=["tree", "case", "metric", "model", "r2",
+                                       "budget", "max_size", "max_fitted", "note"])
+
+
+def format_fit_report(fits: "pd.DataFrame", plan: "pd.DataFrame | None" = None,
+                      min_r2: float = MIN_R2) -> str:
+    """
+    Render the best model per series (and the capacity plan) as text;
+    series whose best R² is below `min_r2` are marked as poor fits.
+    """
+    best = fits[fits["best"]].sort_values(["metric", "case", "tree"])
+    runner_up = (fits[~fits["best"]].groupby(["tree", "case", "metric"])["r2"].max()
+                 .rename("next_r2"))
+    best = best.join(runner_up, on=["tree", "case", "metric"])
+    best["note"] = np.where(best["r2"] >= min_r2, "", "poor fit")
+    lines = ["Best growth model per series (totals over n operations, fitted as a * f(n)):",
+             best[["tree", "case", "metric", "model", "per_op", "r2", "next_r2", "a", "note"]]
+             .to_string(index=False, float_format=lambda v: f"{v:.4g}")]
+    if plan is not None and not plan.empty:
+        plan = plan.assign(max_size=[("-" if math.isnan(v) else "unbounded" if math.isinf(v)
+                                      else f"{int(v):,}") for v in plan["max_size"]])
+        lines += ["", "Largest size within budget:",
+                  plan.to_string(index=False, float_format=lambda v: f"{v:.4g}")]
+    return "\n".join(lines)
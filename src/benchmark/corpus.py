@@ -0,0 +1,129 @@
+# Streaming word loader for benchmarking on real vocabularies
+import gzip
+import re
+import unicodedata
+from typing import Iterable, Iterator, List
+
+
+CORPUS_PREFIX = "corpus:"
+TEXT_PREFIX = "corpus-text:"
+
+_TOKEN_RE = re.compile(r"[^\W\d_]+")
+
+
+def _open_text(path: str):
+    """Open a plain or gzip-compressed text file for line-by-line reading."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", errors="replace")
+    return open(path, "r", encoding="utf-8", errors="replace")
+
+
+def normalise_word(word: str, *, lower: bool = True) -> str:
+    """
+    Normalise one token: strip whitespace, apply NFC and optionally lowercase.
+    :param word: The raw token.
+    :param lower: Lowercase the token if True.
+    :return: The normalised token (may be empty).
+    """
+    word = unicodedata.normalize("NFC", word.strip())
+    return word.lower() if lower else word
+
+
+def iter_corpus(path: str,
+                *,
+                tokenise: bool = False,
+                lower: bool = True,
+                min_len: int = 1,
+                max_words: int | None = None,
+                dedupe: bool = True) -> Iterator[str]:
+    """
+    Stream normalised words from a local file, one at a time.
+
+    - word list    : one token per line (default), `.gz` is read transparently.
+    - tokenised    : with `tokenise=True` every line is split into alphabetic
+                     tokens, so running text can be used as well.
+
+    Words are yielded in file order the first time they are seen. The
+    de-duplication set grows with the *vocabulary*, never with the file
+    size, and `max_words` caps it: the stream stops as soon as that many
+    unique words have been produced.
+
+    :param path: Path to the word list or text file.
+    :param tokenise: Split lines into tokens instead of one token per line.
+    :param lower: Lowercase every token.
+    :param min_len: Skip tokens shorter than this.
+    :param max_words: Stop after this many words (None = whole file).
+    :param dedupe: Drop repeated words if True.
+    :return: Generator of words.
+    """
+    seen = set()
+    produced = 0
+    if max_words is not None and max_words <= 0:
+        return
+
+    with _open_text(path) as fh:
+        for line in fh:
+            tokens = _TOKEN_RE.findall(line) if tokenise else (line,)
+            for token in tokens:
+                word = normalise_word(token, lower=lower)
+                if len(word) < min_len:
+                    continue
+                if dedupe:
+                    if word in seen:
+                        continue
+                    seen.add(word)
+                yield word
+                produced += 1
+                if max_words is not None and produced >= max_words:
+                    return
+
+
+def load_corpus(path: str, n: int, **kwargs) -> List[str]:
+    """
+    Return the first `n` unique words of a corpus file.
+    :param path: Path to the corpus file.
+    :param n: Number of words wanted.
+    :param kwargs: Passed straight to `iter_corpus`.
+    :return: List of exactly `n` words.
+    :raises ValueError: If the corpus has fewer than `n` unique words.
+    """
+    words = list(iter_corpus(path, max_words=n, **kwargs))
+    if len(words) < n:
+        raise ValueError(f"corpus {path!r} only has {len(words)} unique words, {n} requested")
+    return words
+
+
+def build_tree(TreeClass, words: Iterable[str]):
+    """
+    Build a tree straight from an iterable (e.g. `iter_corpus`) without
+    materialising the word list first. Trees that define `finalize()` are
+    finalized once every word is inserted.
+    :param TreeClass: The tree class to instantiate.
+    :param words: Any iterable of words.
+    :return: The filled tree.
+    """
+    tree = TreeClass()
+    for word in words:
+        tree.insert(word)
+    if hasattr(tree, "finalize"):
+        tree.finalize()
+    return tree
+
+
+def parse_corpus_case(case: str) -> tuple[str, bool] | None:
+    """
+    Split a corpus case into (path, tokenise).
+
+    - "corpus:<path>"      : word list, one token per line.
+    - "corpus-text:<path>" : running text, split into tokens.
+
+    :param case: The case string passed to `generate_words`.
+    :return: (path, tokenise), or None for the synthetic cases.
+    """
+    for prefix, tokenise in ((CORPUS_PREFIX, False), (TEXT_PREFIX, True)):
+        if case.startswith(prefix):
+            path = case[len(prefix):]
+            if not path:
+                raise ValueError(f"corpus case needs a path, e.g. '{prefix}data/words.txt'")
+            return path, tokenise
+    return None
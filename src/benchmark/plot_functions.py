@@ -35,7 +35,7 @@ def plot_facet_metrics(
     
     metric_pattern : dict or None
         If provided, a dictionary with 'prefix': ['metric1', 'metric2'...] to identify metrics columns
-        If None, tries to use the standard pattern (tst_*, bst_*)
+        If None, tries to use the standard pattern (<tree>_insert, <tree>_search, <tree>_ram)
     """
     # Print columns for debugging
     print("DataFrame columns:", df.columns.tolist())
@@ -52,7 +52,7 @@ def plot_facet_metrics(
     else:
         # Use standard pattern or look for numeric columns
         # First try standard pattern
-        pattern = re.compile(r'^(tst|bst)_')
+        pattern = re.compile(r'^[a-z]+_(insert|search|ram)$')
         value_vars = [col for col in df.columns if pattern.match(col)]
         
         # If no standard pattern matches, use any numeric columns except id_vars
@@ -0,0 +1,191 @@
+# Opt-in per-phase profiling for benchmark_tree (cProfile, stack sampling, tracemalloc)
+import cProfile
+import json
+import os
+import re
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from contextlib import contextmanager
+
+from src.benchmark.corpus import build_tree
+
+
+class StackSampler:
+    """
+    Samples the call stack of one thread at a fixed interval and counts
+    each distinct stack, for flame graphs in collapsed ("folded") format.
+    Only the innermost `max_depth` frames are kept, so sampling the
+    deeply recursive worst case stays cheap.
+    """
+    def __init__(self, interval: float = 0.001, thread_id: int | None = None,
+                 max_depth: int = 64):
+        """
+        :param interval: Seconds between samples.
+        :param thread_id: Thread to sample; the calling thread if None.
+        :param max_depth: Innermost frames kept per sample.
+        """
+        self._interval = interval
+        self._thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self._max_depth = max_depth
+        self._counts = Counter()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._interval):
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None and len(stack) < self._max_depth:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            if frame is not None:
+                stack.append(None)      # marks a truncated stack
+            if stack:
+                self._counts[tuple(reversed(stack))] += 1
+
+    @staticmethod
+    def _label(code) -> str:
+        if code is None:
+            return "[truncated]"
+        return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def write_folded(self, path: str) -> int:
+        """
+        Write "frame;frame;frame count" lines, as read by flamegraph.pl,
+        speedscope or inferno.
+        :param path: Output file.
+        :return: Number of samples taken.
+        """
+        with open(path, "w") as fh:
+            for stack, count in self._counts.most_common():
+                fh.write(";".join(self._label(code) for code in stack) + f" {count}\n")
+        return sum(self._counts.values())
+
+
+class PhaseProfiler:
+    """
+    Profiles named phases of one benchmark run and writes, per phase,
+    `<tag>_<phase>.prof` (cProfile, open with pstats or snakeviz) and
+    `<tag>_<phase>.folded` (sampled stacks), plus `<tag>.json` with wall
+    time, sample count and tracemalloc peak per phase.
+
+    tracemalloc slows deep recursion down by an order of magnitude, so
+    allocation peaks are recorded in a separate pass (`alloc_phase`)
+    rather than on top of cProfile.
+    """
+    def __init__(self, out_dir: str, tag: str, sample_interval: float | None = 0.001):
+        """
+        :param out_dir: Directory for the profile files (created if needed).
+        :param tag: File name prefix, e.g. "tst_average_5000".
+        :param sample_interval: Seconds between stack samples; None or 0
+                                disables the sampler.
+        """
+        os.makedirs(out_dir, exist_ok=True)
+        self._base = os.path.join(out_dir, re.sub(r"[^\w.-]+", "-", tag))
+        self._sample_interval = sample_interval
+        self.summary = {}
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        Run the body of a `with` block under cProfile (and the stack
+        sampler) as phase `name`.
+        """
+        profile = cProfile.Profile()
+        sampler = StackSampler(self._sample_interval) if self._sample_interval else None
+        if sampler is not None:
+            sampler.start()
+        start = time.perf_counter()
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            duration = time.perf_counter() - start
+            if sampler is not None:
+                sampler.stop()
+
+            profile.dump_stats(f"{self._base}_{name}.prof")
+            entry = self.summary.setdefault(name, {})
+            entry["seconds"] = duration
+            if sampler is not None:
+                entry["samples"] = sampler.write_folded(f"{self._base}_{name}.folded")
+
+    @contextmanager
+    def alloc_phase(self, name: str):
+        """
+        Record the tracemalloc peak of the body of a `with` block as the
+        allocation peak of phase `name`.
+        """
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        base_mem, _ = tracemalloc.get_traced_memory()
+        try:
+            yield
+        finally:
+            _, peak = tracemalloc.get_traced_memory()
+            if not was_tracing:
+                tracemalloc.stop()
+            self.summary.setdefault(name, {})["peak_alloc_mb"] = (peak - base_mem) / 1e6
+
+    def write_summary(self) -> str:
+        """
+        Write the per-phase summary as JSON.
+        :return: Path of the summary file.
+        """
+        path = f"{self._base}.json"
+        with open(path, "w") as fh:
+            json.dump(self.summary, fh, indent=2)
+        return path
+
+
+def _search_all(tree, words):
+    for word in words:
+        tree.search(word)
+
+
+def profile_tree(TreeClass, words, out_dir: str, tag: str,
+                 sample_interval: float | None = 0.001,
+                 trace_alloc: bool = True) -> dict:
+    """
+    Run extra, untimed insert + search passes of `benchmark_tree` under
+    the profilers, so the recorded timings are not distorted by them:
+    one pass under cProfile and the sampler, one under tracemalloc.
+    :param TreeClass: The tree class to profile.
+    :param words: Words to insert and search.
+    :param out_dir: Directory for the profile files.
+    :param tag: File name prefix, usually "<tree>_<case>_<size>".
+    :param sample_interval: Seconds between stack samples; None disables it.
+    :param trace_alloc: Also record tracemalloc peaks if True.
+    :return: Per-phase summary (seconds, samples, peak_alloc_mb).
+    """
+    profiler = PhaseProfiler(out_dir, tag, sample_interval)
+    with profiler.phase("insert"):
+        tree = build_tree(TreeClass, words)
+    with profiler.phase("search"):
+        _search_all(tree, words)
+
+    if trace_alloc:
+        del tree
+        with profiler.alloc_phase("insert"):
+            tree = build_tree(TreeClass, words)
+        with profiler.alloc_phase("search"):
+            _search_all(tree, words)
+
+    profiler.write_summary()
+    return profiler.summary
@@ -0,0 +1,193 @@
+# Registry of benchmarkable structures, including adapters for Python builtins
+from bisect import bisect_left, insort
+from typing import Iterator
+
+from src.tstree.tstree import TSTree
+from src.btree.btree import Btree
+from src.dawg.dawg import Dawg
+
+
+class SetTree:
+    """Builtin `set` behind the insert/search interface."""
+    def __init__(self):
+        self._items = set()
+
+    def insert(self, string: str) -> None:
+        self._items.add(string)
+
+    def search(self, string: str) -> bool:
+        return string in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class DictTree:
+    """Builtin `dict` (keys only) behind the insert/search interface."""
+    def __init__(self):
+        self._items = {}
+
+    def insert(self, string: str) -> None:
+        self._items[string] = True
+
+    def search(self, string: str) -> bool:
+        return string in self._items
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SortedListTree:
+    """A list kept sorted with `bisect.insort` on every insert."""
+    def __init__(self):
+        self._items = []
+
+    def insert(self, string: str) -> None:
+        i = bisect_left(self._items, string)
+        if i == len(self._items) or self._items[i] != string:
+            insort(self._items, string, lo=i)
+
+    def search(self, string: str) -> bool:
+        i = bisect_left(self._items, string)
+        return i < len(self._items) and self._items[i] == string
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class SortedArrayTree:
+    """
+    A sorted tuple built once: inserts are buffered and `finalize()` sorts
+    and de-duplicates them. Searching an unfinalized array finalizes it.
+    """
+    def __init__(self):
+        self._pending = []
+        self._items = ()
+
+    def insert(self, string: str) -> None:
+        if self._items:
+            raise TypeError("SortedArrayTree is frozen after finalize()")
+        self._pending.append(string)
+
+    def finalize(self) -> None:
+        """Sort the buffered words into the frozen array."""
+        if self._pending:
+            self._items = tuple(sorted(set(self._pending)))
+            self._pending = []
+
+    def search(self, string: str) -> bool:
+        if self._pending:
+            self.finalize()
+        i = bisect_left(self._items, string)
+        return i < len(self._items) and self._items[i] == string
+
+    def prefix_search(self, prefix: str) -> Iterator[str]:
+        """
+        Yield all words starting with `prefix`, in sorted order.
+        :param prefix: The prefix to look for.
+        """
+        if self._pending:
+            self.finalize()
+        i = bisect_left(self._items, prefix)
+        while i < len(self._items) and self._items[i].startswith(prefix):
+            yield self._items[i]
+            i += 1
+
+    def __len__(self) -> int:
+        return len(self._items) + len(self._pending)
+
+
+class DawgTree:
+    """
+    `Dawg` behind the insert/search interface: inserts are buffered and
+    `finalize()` builds the minimised automaton from the sorted words.
+    """
+    def __init__(self):
+        self._pending = []
+        self._dawg = Dawg()
+
+    def insert(self, string: str) -> None:
+        if self._dawg.word_count():
+            raise TypeError("DawgTree is frozen after finalize()")
+        self._pending.append(string)
+
+    def finalize(self) -> None:
+        """Build the automaton from the buffered words."""
+        if self._pending:
+            self._dawg = Dawg.from_sorted(sorted(self._pending))
+            self._pending = []
+
+    def search(self, string: str) -> bool:
+        if self._pending:
+            self.finalize()
+        return self._dawg.search(string)
+
+    def __len__(self) -> int:
+        return len(self._dawg)
+
+
+# labels must not contain "_": result columns are named "<label>_<metric>"
+TREE_REGISTRY = {
+    "tst": TSTree,
+    "bst": Btree,
+    "set": SetTree,
+    "dict": DictTree,
+    "bisect": SortedListTree,
+    "sarray": SortedArrayTree,
+    "dawg": DawgTree,
+}
+
+CUSTOM_TREES = ("tst", "bst", "dawg")
+BUILTIN_TREES = ("set", "dict", "bisect", "sarray")
+
+
+def get_tree_specs(names=None) -> list[tuple[str, type]]:
+    """
+    Return (label, TreeClass) pairs for `run_comparison`.
+    :param names: Labels from `TREE_REGISTRY`; all of them if None.
+    :return: List of (label, TreeClass) tuples in the requested order.
+    """
+    if names is None:
+        names = list(TREE_REGISTRY)
+    unknown = [name for name in names if name not in TREE_REGISTRY]
+    if unknown:
+        raise ValueError(f"unknown tree(s) {unknown}; choose from {list(TREE_REGISTRY)}")
+    return [(name, TREE_REGISTRY[name]) for name in names]
+
+
+def builtin_gap(df, trees=CUSTOM_TREES, baselines=BUILTIN_TREES):
+    """
+    How many times slower (or bigger) each custom tree is than the best
+    builtin baseline, per size and metric, plus the absolute difference.
+
+    The RSS delta of the builtins is usually 0 MB at these sizes, which
+    leaves the ram ratio undefined (NaN); use `diff` (MB more than the
+    leanest builtin) for memory instead.
+
+    :param df: Wide DataFrame from `run_comparison` (optionally with a case column).
+    :param trees: Labels of the custom trees to report.
+    :param baselines: Labels of the builtin baselines to compare against.
+    :return: Long DataFrame with size, (case,) tree, metric, best_builtin, ratio
+             and diff; a ratio below 1 (diff below 0) means the custom tree
+             beats every builtin.
+    """
+    import pandas as pd
+
+    id_cols = [c for c in ("case", "size") if c in df.columns]
+    rows = []
+    for record in df.to_dict("records"):
+        for metric in ("insert", "search", "ram"):
+            builtin = {b: record[f"{b}_{metric}"] for b in baselines
+                       if f"{b}_{metric}" in record}
+            if not builtin:
+                continue
+            best = min(builtin, key=builtin.get)
+            for tree in trees:
+                col = f"{tree}_{metric}"
+                if col not in record:
+                    continue
+                ratio = record[col] / builtin[best] if builtin[best] > 0 else float("nan")
+                rows.append({**{c: record[c] for c in id_cols}, "tree": tree,
+                             "metric": metric, "best_builtin": best, "ratio": ratio,
+                             "diff": record[col] - builtin[best]})
+    return pd.DataFrame(rows)
@@ -0,0 +1,259 @@
+# Long-format SQLite store for benchmark results and run metadata
+import os
+import platform
+import socket
+import sqlite3
+import subprocess
+import sys
+import uuid
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Iterable
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+DEFAULT_STORE = "data/results.sqlite"
+
+# kind of run: "benchmark" for run_comparison sweeps, "workload:<name>" for
+# the lookup workloads; runs stored before the column existed are benchmarks
+BENCHMARK_KIND = "benchmark"
+
+RESULT_COLUMNS = ("tree", "case", "size", "metric", "sample", "value", "key_len")
+METADATA_COLUMNS = ("run_id", "host", "python", "git_commit", "cpu", "timestamp",
+                    "calibration", "kind")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    run_id     TEXT    NOT NULL,
+    tree       TEXT    NOT NULL,
+    "case"     TEXT    NOT NULL,
+    size       INTEGER NOT NULL,
+    metric     TEXT    NOT NULL,
+    sample     INTEGER NOT NULL,
+    value      REAL    NOT NULL,
+    key_len    REAL,
+    host       TEXT,
+    python     TEXT,
+    git_commit TEXT,
+    cpu        TEXT,
+    timestamp  TEXT,
+    calibration REAL,
+    kind       TEXT
+);
+CREATE INDEX IF NOT EXISTS results_key
+    ON results (tree, "case", size, metric);
+CREATE INDEX IF NOT EXISTS results_run
+    ON results (run_id);
+"""
+
+
+def _git_commit() -> str:
+    """Return the current git commit hash, or 'unknown' outside a checkout."""
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True,
+                             text=True, timeout=5,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+    except (OSError, subprocess.SubprocessError):
+        return "unknown"
+    return out.stdout.strip() or "unknown"
+
+
+def _cpu_model() -> str:
+    """Return the CPU model name (from /proc/cpuinfo on Linux)."""
+    try:
+        with open("/proc/cpuinfo") as fh:
+            for line in fh:
+                if line.startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    return platform.processor() or platform.machine() or "unknown"
+
+
+def collect_run_metadata(calibration: float | None = None,
+                         kind: str = BENCHMARK_KIND) -> dict:
+    """
+    Describe the machine and code version of the current run.
+    :param calibration: Result of `benchmark.calibrate()` on this machine.
+    :param kind: "benchmark" or "workload:<name>", see `BENCHMARK_KIND`.
+    :return: Dict with run_id, host, python, git_commit, cpu, timestamp,
+             calibration and kind.
+    """
+    return {
+        "run_id": uuid.uuid4().hex,
+        "host": socket.gethostname(),
+        "python": platform.python_version(),
+        "git_commit": _git_commit(),
+        "cpu": _cpu_model(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "calibration": calibration,
+        "kind": kind,
+    }
+
+
+def connect(path: str = DEFAULT_STORE) -> sqlite3.Connection:
+    """
+    Open (and create if needed) a results store.
+    :param path: Path to the SQLite file.
+    :return: An open connection with the schema in place.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.executescript(_SCHEMA)
+    # stores created before the calibration, key_len and kind columns existed
+    existing = {row[1] for row in conn.execute("PRAGMA table_info(results)")}
+    for column, sql_type in (("calibration", "REAL"), ("key_len", "REAL"), ("kind", "TEXT")):
+        if column not in existing:
+            conn.execute(f"ALTER TABLE results ADD COLUMN {column} {sql_type}")
+    return conn
+
+
+def append_results(rows: Iterable[dict],
+                   path: str = DEFAULT_STORE,
+                   metadata: dict | None = None) -> str:
+    """
+    Append long-format rows (as filled by `run_comparison(..., samples=...)`)
+    to the store, stamping each one with the run metadata.
+    :param rows: Dicts with keys tree, case, size, metric, sample, value and
+                 optionally key_len (mean word length, left empty if absent).
+    :param path: Path to the SQLite file.
+    :param metadata: Run metadata; collected from this machine if None.
+    :return: The run_id the rows were stored under.
+    """
+    if metadata is None:
+        metadata = collect_run_metadata()
+    meta = tuple(metadata[col] for col in METADATA_COLUMNS)
+    records = [meta + tuple(row.get(col) for col in RESULT_COLUMNS) for row in rows]
+
+    columns = METADATA_COLUMNS + RESULT_COLUMNS
+    placeholders = ", ".join("?" for _ in columns)
+    names = ", ".join(f'"{col}"' for col in columns)
+    with connect(path) as conn:
+        conn.executemany(f"INSERT INTO results ({names}) VALUES ({placeholders})", records)
+    conn.close()
+    return metadata["run_id"]
+
+
+def load_results(path: str = DEFAULT_STORE, **filters) -> "pd.DataFrame":
+    """
+    Load results from the store as a long DataFrame.
+
+    Filters are column=value pairs; a list or tuple value matches any of
+    its items, e.g. ``load_results(tree=["tst", "bst"], case="worst")``.
+
+    :param path: Path to the SQLite file.
+    :param filters: Column filters applied in SQL.
+    :return: DataFrame with one row per (run, tree, case, size, metric, sample).
+    """
+    clauses, params = [], []
+    for col, value in filters.items():
+        if col not in METADATA_COLUMNS + RESULT_COLUMNS:
+            raise ValueError(f"unknown column {col!r}")
+        if isinstance(value, (list, tuple)):
+            clauses.append(f'"{col}" IN ({", ".join("?" for _ in value)})')
+            params.extend(value)
+        else:
+            clauses.append(f'"{col}" = ?')
+            params.append(value)
+
+    import pandas as pd
+
+    query = "SELECT * FROM results"
+    if clauses:
+        query += " WHERE " + " AND ".join(clauses)
+    with connect(path) as conn:
+        df = pd.read_sql_query(query, conn, params=params)
+    conn.close()
+    return df
+
+
+def summarise(df: "pd.DataFrame",
+              by=("run_id", "tree", "case", "size", "metric")) -> "pd.DataFrame":
+    """
+    Aggregate the samples of a long DataFrame into mean, std and count.
+    :param df: Output of `load_results`.
+    :param by: Columns that identify one measured series point.
+    :return: DataFrame with one row per group.
+    """
+    return (df.groupby(list(by))["value"]
+              .agg(["mean", "std", "count"])
+              .reset_index())
+
+
+def import_wide_csv(csv_path: str,
+                    path: str = DEFAULT_STORE,
+                    host: str | None = None) -> str:
+    """
+    Import a legacy wide CSV (as written by `run_cron_comparison`) into the
+    store. Every value becomes sample 0; unknown metadata is left empty.
+    :param csv_path: Path to the wide CSV file.
+    :param path: Path to the SQLite file.
+    :param host: Host name to record, defaults to the file's base name.
+    :return: The run_id the rows were stored under.
+    """
+    wide = read_wide_csv(csv_path)
+    rows = wide_to_long(wide)
+    metadata = {
+        "run_id": uuid.uuid4().hex,
+        "host": host or os.path.splitext(os.path.basename(csv_path))[0],
+        "python": None,
+        "git_commit": None,
+        "cpu": None,
+        "timestamp": None,
+        "calibration": None,
+        "kind": BENCHMARK_KIND,
+    }
+    return append_results(rows, path, metadata)
+
+
+def read_wide_csv(csv_path: str) -> "pd.DataFrame":
+    """
+    Read a wide results CSV and drop the unnamed index column left by
+    `DataFrame.to_csv`.
+    """
+    import pandas as pd
+
+    df = pd.read_csv(csv_path)
+    return df.drop(columns=[c for c in df.columns if c.startswith("Unnamed")])
+
+
+def _optional_float(value) -> float | None:
+    """Return value as a float, or None if it is missing or NaN."""
+    if value is None or value != value:
+        return None
+    return float(value)
+
+
+def wide_to_long(wide: "pd.DataFrame", case: str | None = None) -> list[dict]:
+    """
+    Turn "<tree>_<metric>" columns into long-format rows.
+    :param wide: DataFrame with a size column (and a case column unless
+                 `case` is given), an optional key_len column, plus
+                 "<tree>_<metric>" columns.
+    :param case: Case label to use when the frame has no case column.
+    :return: List of dicts with keys tree, case, size, metric, sample, value
+             and key_len (None for CSVs written before it was recorded).
+    """
+    value_cols = [c for c in wide.columns if c not in ("size", "case", "key_len") and "_" in c]
+    rows = []
+    for record in wide.to_dict("records"):
+        for col in value_cols:
+            tree, metric = col.rsplit("_", 1)
+            rows.append({"tree": tree,
+                         "case": record.get("case", case),
+                         "size": int(record["size"]),
+                         "metric": metric,
+                         "sample": 0,
+                         "value": float(record[col]),
+                         "key_len": _optional_float(record.get("key_len"))})
+    return rows
+
+
+if __name__ == "__main__":
+    # python -m src.benchmark.results_store data/df_*.csv  -> import legacy CSVs
+    for csv_file in sys.argv[1:]:
+        run = import_wide_csv(csv_file)
+        print(f"Imported {csv_file} as run {run}")
@@ -0,0 +1,320 @@
+# Lookup workloads beyond "search every inserted word once"
+import random
+import string
+import time
+from collections import defaultdict
+from functools import partial
+from typing import TYPE_CHECKING, List
+
+from src.benchmark.benchmark import generate_words
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def make_misses(words: List[str], n: int, *, seed: int | None = None) -> List[str]:
+    """
+    Produce `n` words that are *not* in `words`, each a stored word with
+    one character replaced. Misses therefore share a prefix with real keys
+    and make the trees descend before failing, as real typos do.
+    :param words: The stored words.
+    :param n: Number of misses wanted.
+    :param seed: Optional random seed.
+    :return: List of `n` absent words (may repeat for tiny word sets).
+    """
+    rng = random.Random(seed)
+    present = set(words)
+    candidates = [w for w in words if w]
+    if not candidates:
+        raise ValueError("need at least one non-empty word to derive misses")
+
+    misses = []
+    attempts = 0
+    while len(misses) < n:
+        word = rng.choice(candidates)
+        pos = rng.randrange(len(word))
+        miss = word[:pos] + rng.choice(string.ascii_lowercase) + word[pos + 1:]
+        attempts += 1
+        if miss not in present:
+            misses.append(miss)
+        elif attempts > 100 * n:
+            # dense word sets (e.g. the worst case) leave no one-letter misses
+            misses.append(word + rng.choice(string.ascii_lowercase) + "#")
+    return misses
+
+
+def mixed_queries(words: List[str], n_queries: int, miss_ratio: float,
+                  *, seed: int | None = None) -> List[str]:
+    """
+    A shuffled query list in which a `miss_ratio` fraction are misses and
+    the rest are drawn from `words`.
+    """
+    rng = random.Random(seed)
+    n_miss = round(n_queries * miss_ratio)
+    queries = make_misses(words, n_miss, seed=seed)
+    queries += [rng.choice(words) for _ in range(n_queries - n_miss)]
+    rng.shuffle(queries)
+    return queries
+
+
+def benchmark_lookups(tree, queries: List[str], repeat: int = 3) -> float:
+    """
+    Average time to run every query against an already built tree.
+    :param tree: A filled tree exposing `search`.
+    :param queries: The lookups to run.
+    :param repeat: Number of repetitions to average.
+    :return: Average duration in seconds.
+    """
+    total = 0.0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for query in queries:
+            tree.search(query)
+        total += time.perf_counter() - start
+    return total / repeat
+
+
+def run_miss_comparison(sizes: list[int],
+                        tree_specs: list[tuple[str, type]],
+                        repeat: int = 3,
+                        case: str = "average",
+                        *,
+                        miss_ratio: float = 0.9,
+                        fp_rate: float = 0.01,
+                        verbose: bool = True) -> "pd.DataFrame":
+    """
+    Benchmark miss-heavy lookups with and without a Bloom filter front.
+
+    Each tree class must accept `expected_keys` and `fp_rate` (as `TSTree`
+    and `Btree` do). For every label the plain tree and "<label>bloom" are
+    measured on the same queries.
+
+    Parameters
+    ----------
+    sizes      : list of word-set sizes to test
+    tree_specs : list of (label, TreeClass) tuples
+    repeat     : repetitions of the query list
+    case       : word case passed to `generate_words`
+    miss_ratio : fraction of queries that are absent
+    fp_rate    : Bloom filter false-positive target
+    verbose    : print progress if True
+
+    Returns
+    -------
+    pd.DataFrame, one row per `size`, with columns "<label>_lookup",
+    "<label>bloom_lookup", "<label>bloom_bytes" (filter size) and
+    "<label>bloom_speedup".
+    """
+    results = defaultdict(list)
+    for size in sizes:
+        words = generate_words(size, case=case)
+        queries = mixed_queries(words, size, miss_ratio, seed=size)
+        results["size"].append(size)
+
+        if verbose:
+            print(f"\nLookups on {size} words ({case} case, {miss_ratio:.0%} misses)…")
+
+        for label, TreeClass in tree_specs:
+            timings = {}
+            for variant, factory in ((label, TreeClass),
+                                     (f"{label}bloom", partial(TreeClass, expected_keys=size,
+                                                               fp_rate=fp_rate))):
+                tree = factory()
+                for word in words:
+                    tree.insert(word)
+                timings[variant] = benchmark_lookups(tree, queries, repeat)
+                results[f"{variant}_lookup"].append(timings[variant])
+
+            results[f"{label}bloom_bytes"].append(tree.filter_nbytes)
+            speedup = timings[label] / timings[f"{label}bloom"]
+            results[f"{label}bloom_speedup"].append(speedup)
+
+            if verbose:
+                print(f"{label:<8}| plain {timings[label]:.4f}s | bloom "
+                      f"{timings[f'{label}bloom']:.4f}s | x{speedup:.2f} "
+                      f"| +{tree.filter_nbytes / 1e6:.3f} MB")
+
+    import pandas as pd
+    return pd.DataFrame(results)
+
+
+def zipf_queries(words: List[str], n_queries: int, s: float = 1.1,
+                 *, seed: int | None = None) -> List[str]:
+    """
+    Draw `n_queries` words with Zipf-like popularity: the i-th word of a
+    random ranking is chosen with weight 1 / i**s, so a few words dominate
+    as in real autocomplete traffic.
+    """
+    rng = random.Random(seed)
+    ranking = list(words)
+    rng.shuffle(ranking)
+    weights = [1 / (i + 1) ** s for i in range(len(ranking))]
+    return rng.choices(ranking, weights=weights, k=n_queries)
+
+
+def autocomplete_queries(words: List[str], n_queries: int, s: float = 1.1,
+                         *, seed: int | None = None) -> List[str]:
+    """
+    Skewed prefix queries: each is a popular word (see `zipf_queries`)
+    truncated to a random length, as typed into a search box.
+    """
+    rng = random.Random(seed)
+    return [word[:rng.randint(1, len(word))]
+            for word in zipf_queries([w for w in words if w], n_queries, s, seed=seed)]
+
+
+def run_cache_comparison(sizes: list[int],
+                         repeat: int = 3,
+                         case: str = "average",
+                         *,
+                         cache_size: int = 1024,
+                         zipf_s: float = 1.1,
+                         limit: int = 10,
+                         verbose: bool = True) -> "pd.DataFrame":
+    """
+    Benchmark skewed searches and completions on `TSTree` with and without
+    the prefix cache.
+
+    Parameters
+    ----------
+    sizes      : list of word-set sizes to test
+    repeat     : repetitions of the query lists
+    case       : word case passed to `generate_words`
+    cache_size : entries of the LRU prefix cache
+    zipf_s     : skew of the query popularity (larger = hotter head)
+    limit      : completions taken per prefix query
+    verbose    : print progress if True
+
+    Returns
+    -------
+    pd.DataFrame, one row per `size`, with columns "tst_search",
+    "tstcache_search", "tst_complete", "tstcache_complete",
+    "tstcache_hitrate" and "tstcache_evictions".
+    """
+    from itertools import islice
+    from src.tstree.tstree import TSTree
+
+    def _complete_all(tree, prefixes):
+        for prefix in prefixes:
+            for _ in islice(tree.iter_prefix(prefix), limit):
+                pass
+
+    results = defaultdict(list)
+    for size in sizes:
+        words = generate_words(size, case=case)
+        searches = zipf_queries(words, size, zipf_s, seed=size)
+        prefixes = autocomplete_queries(words, size, zipf_s, seed=size + 1)
+        results["size"].append(size)
+
+        for label, factory in (("tst", TSTree), ("tstcache", partial(TSTree, cache_size=cache_size))):
+            tree = factory()
+            for word in words:
+                tree.insert(word)
+            results[f"{label}_search"].append(benchmark_lookups(tree, searches, repeat))
+
+            total = 0.0
+            for _ in range(repeat):
+                start = time.perf_counter()
+                _complete_all(tree, prefixes)
+                total += time.perf_counter() - start
+            results[f"{label}_complete"].append(total / repeat)
+
+        info = tree.cache_info()
+        lookups = info.hits + info.resumes + info.misses
+        results["tstcache_hitrate"].append((info.hits + info.resumes) / lookups if lookups else 0.0)
+        results["tstcache_evictions"].append(info.evictions)
+
+        if verbose:
+            print(f"{size:>7} words | search {results['tst_search'][-1]:.4f}s -> "
+                  f"{results['tstcache_search'][-1]:.4f}s | complete "
+                  f"{results['tst_complete'][-1]:.4f}s -> {results['tstcache_complete'][-1]:.4f}s "
+                  f"| hit rate {results['tstcache_hitrate'][-1]:.1%}")
+
+    import pandas as pd
+    return pd.DataFrame(results)
+
+
+def run_shard_scaling(sizes: list[int],
+                      workers: tuple[int, ...] = (1, 2, 4),
+                      repeat: int = 3,
+                      case: str = "average",
+                      *,
+                      min_prefix: int = 1,
+                      verbose: bool = True) -> "pd.DataFrame":
+    """
+    Benchmark parallel build and batch search of `ShardedTSTree` against a
+    single in-process `TSTree`, for each worker count.
+
+    Worker start-up is excluded from the timings; pickling the batches to
+    and from the workers is included.
+
+    Parameters
+    ----------
+    sizes      : list of word-set sizes to test
+    workers    : worker counts to test
+    repeat     : repetitions to average
+    case       : word case passed to `generate_words`
+    min_prefix : shortest shard boundary prefix
+    verbose    : print progress if True
+
+    Returns
+    -------
+    pd.DataFrame, one row per `size`, with columns "tst_insert",
+    "tst_search" and, per worker count k, "shard<k>_insert",
+    "shard<k>_search", "shard<k>_speedup" (single-tree build time over
+    sharded build time) and "shard<k>_imbalance" (largest shard node
+    count over the mean of the shards actually started, which can be
+    fewer than k for samples with few distinct keys).
+    """
+    from src.tstree.sharded import ShardedTSTree
+    from src.tstree.tstree import TSTree
+
+    results = defaultdict(list)
+    for size in sizes:
+        words = generate_words(size, case=case)
+        sample = random.Random(size).sample(words, min(1000, len(words)))
+        results["size"].append(size)
+
+        insert_total = search_total = 0.0
+        for _ in range(repeat):
+            start = time.perf_counter()
+            tree = TSTree()
+            for word in words:
+                tree.insert(word)
+            insert_total += time.perf_counter() - start
+            start = time.perf_counter()
+            for word in words:
+                tree.search(word)
+            search_total += time.perf_counter() - start
+        results["tst_insert"].append(insert_total / repeat)
+        results["tst_search"].append(search_total / repeat)
+        if verbose:
+            print(f"\n{size} words ({case} case) | tst insert {insert_total / repeat:.4f}s "
+                  f"| search {search_total / repeat:.4f}s")
+
+        for k in workers:
+            insert_total = search_total = 0.0
+            for _ in range(repeat):
+                with ShardedTSTree(k, sample, min_prefix) as tree:
+                    start = time.perf_counter()
+                    tree.insert_many(words)
+                    insert_total += time.perf_counter() - start
+                    start = time.perf_counter()
+                    tree.search_many(words)
+                    search_total += time.perf_counter() - start
+                    sizes_per_shard = tree.shard_sizes()
+            label = f"shard{k}"
+            results[f"{label}_insert"].append(insert_total / repeat)
+            results[f"{label}_search"].append(search_total / repeat)
+            results[f"{label}_speedup"].append(results["tst_insert"][-1] / results[f"{label}_insert"][-1])
+            mean = sum(sizes_per_shard) / len(sizes_per_shard)    # may be fewer than k shards
+            results[f"{label}_imbalance"].append(max(sizes_per_shard) / mean if mean else 1.0)
+
+            if verbose:
+                print(f"{label:<8}| insert {results[f'{label}_insert'][-1]:.4f}s "
+                      f"| search {results[f'{label}_search'][-1]:.4f}s "
+                      f"| x{results[f'{label}_speedup'][-1]:.2f} "
+                      f"| {len(sizes_per_shard)} shards, imbalance {results[f'{label}_imbalance'][-1]:.2f}")
+
+    import pandas as pd
+    return pd.DataFrame(results)
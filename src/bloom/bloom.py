@@ -0,0 +1,94 @@
+# Bloom filter: probabilistic set membership for fast negative lookups
+import math
+
+
+class BloomFilter:
+    """
+    A bit array with k hash positions per key.
+
+    `might_contain` never returns False for an added key; for other keys it
+    returns True with probability close to `fp_rate` while at most
+    `capacity` keys have been added. Positions are derived from the
+    built-in `hash()` by double hashing, so a filter is only meaningful
+    inside the process that filled it (string hashes are salted per
+    interpreter).
+    """
+    def __init__(self, capacity: int, fp_rate: float = 0.01):
+        """
+        Size the filter for an expected number of keys.
+        :param capacity: Expected number of keys.
+        :param fp_rate: Target false-positive rate, between 0 and 1.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be a positive integer")
+        if not 0 < fp_rate < 1:
+            raise ValueError("fp_rate must be between 0 and 1")
+
+        # optimal sizes: m = -n ln p / (ln 2)^2 bits, k = m / n * ln 2 hashes
+        self._size = max(8, math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2))
+        self._hashes = max(1, round(self._size / capacity * math.log(2)))
+        self._bits = bytearray((self._size + 7) // 8)
+        self._capacity = capacity
+        self._fp_rate = fp_rate
+        self._count = 0
+
+    def _positions(self, key: str) -> range:
+        """
+        The k bit positions of a key, as h1 + i * h2 (mod m).
+        :param key: The key to hash.
+        :return: A range over the unreduced positions.
+        """
+        h = hash(key) & 0xFFFFFFFFFFFFFFFF
+        h1, h2 = h & 0xFFFFFFFF, (h >> 32) | 1
+        return range(h1, h1 + self._hashes * h2, h2)
+
+    def add(self, key: str) -> None:
+        """
+        Add a key to the filter. Only keys that set at least one new bit
+        are counted, so re-adding a key (or a false positive) does not
+        raise the load seen by `expected_fp_rate`.
+        :param key: The key to add.
+        """
+        bits, size = self._bits, self._size
+        changed = False
+        for pos in self._positions(key):
+            pos %= size
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                changed = True
+        if changed:
+            self._count += 1
+
+    def might_contain(self, key: str) -> bool:
+        """
+        Test a key.
+        :param key: The key to test.
+        :return: False if the key was certainly never added.
+        """
+        bits, size = self._bits, self._size
+        for pos in self._positions(key):
+            pos %= size
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def __contains__(self, key: str) -> bool:
+        return self.might_contain(key)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the bit array in bytes."""
+        return len(self._bits)
+
+    def expected_fp_rate(self) -> float:
+        """
+        False-positive rate predicted for the keys added so far,
+        (1 - e^(-k n / m))^k.
+        """
+        k, n, m = self._hashes, self._count, self._size
+        return (1 - math.exp(-k * n / m)) ** k
+
+    def __repr__(self) -> str:
+        return (f"BloomFilter({self._count}/{self._capacity} keys, "
+                f"{self._size} bits, k={self._hashes})")
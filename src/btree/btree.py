@@ -1,3 +1,6 @@
+from typing import Iterator
+
+
 class BtreeNode:
 
     def __init__(self, string):
@@ -27,13 +30,33 @@ class BtreeNode:
             return self._gt is not None and self._gt._search(string)
 
     def _all_strings(self):
-        strings = [self._string]
+        strings = []
         if self._lt is not None:
             strings.extend(self._lt._all_strings())
+        strings.append(self._string)
         if self._gt is not None:
             strings.extend(self._gt._all_strings())
         return strings
 
+    def _range(self, lo, hi, reverse=False):
+        # in-order walk with an explicit stack; subtrees that lie entirely
+        # below lo or at/above hi are never pushed
+        stack = [self]
+        while stack:
+            node = stack.pop()
+            if node.__class__ is str:
+                yield node
+                continue
+            string = node._string
+            children = []
+            if node._lt is not None and (lo is None or string > lo):
+                children.append(node._lt)
+            if (lo is None or string >= lo) and (hi is None or string < hi):
+                children.append(string)
+            if node._gt is not None and (hi is None or string < hi):
+                children.append(node._gt)
+            stack.extend(children if reverse else reversed(children))
+
     def __len__(self):
         length = 1
         if self._lt is not None:
@@ -56,27 +79,76 @@ class BtreeNode:
 
 class Btree:
 
-    def __init__(self):
+    def __init__(self, expected_keys=None, fp_rate=0.01):
+        # optional Bloom filter in front of the tree for fast misses
         self._root = None
+        self._filter = None
+        if expected_keys is not None:
+            from src.bloom.bloom import BloomFilter
+            self._filter = BloomFilter(expected_keys, fp_rate)
 
     def insert(self, string):
         if self._root is None:
             self._root = BtreeNode(string)
         else:
             self._root._insert(string)
+        if self._filter is not None:
+            self._filter.add(string)
 
     def search(self, string):
         if self._root is None:
             return False
+        elif self._filter is not None and not self._filter.might_contain(string):
+            return False
         else:
             return self._root._search(string)
 
+    @property
+    def filter_nbytes(self):
+        """Size of the Bloom filter in bytes, 0 without a filter."""
+        return 0 if self._filter is None else self._filter.nbytes
+
     def all_strings(self):
         if self._root is None:
             return []
         else:
             return self._root._all_strings()
 
+    def range(self, lo=None, hi=None, reverse=False) -> Iterator[str]:
+        """
+        Iterate over the strings s with lo <= s < hi in sorted order
+        (descending if reverse), visiting O(depth + output) nodes.
+        """
+        if self._root is None:
+            return iter(())
+        else:
+            return self._root._range(lo, hi, reverse)
+
+    def ceiling(self, string):
+        """Smallest stored string >= string, or None."""
+        return next(self.range(string, None), None)
+
+    def floor(self, string):
+        """Largest stored string <= string, or None."""
+        if self.search(string):
+            return string
+        return self.predecessor(string)
+
+    def successor(self, string):
+        """Smallest stored string > string, or None."""
+        for candidate in self.range(string, None):
+            if candidate != string:
+                return candidate
+        return None
+
+    def predecessor(self, string):
+        """Largest stored string < string, or None."""
+        return next(self.range(None, string, reverse=True), None)
+
+    def rank(self, string):
+        """Number of stored strings < string; O(depth + rank) without subtree counts."""
+        return sum(1 for _ in self.range(None, string))
+
     def __len__(self):
         if self._root is None:
             return 0
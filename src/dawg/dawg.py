@@ -0,0 +1,192 @@
+# Directed acyclic word graph (minimal acyclic automaton) for frozen word sets
+from typing import Iterable, Iterator
+
+
+class DawgNode:
+    """A state in the automaton; edges are kept in sorted character order."""
+    def __init__(self):
+        """
+        Initialize a non-final state without outgoing edges.
+        """
+        self._final = False
+        self._edges = {}
+
+    def _signature(self) -> tuple:
+        """
+        Key that is equal for two states with the same right language,
+        provided their children are already minimised.
+        :return: Tuple of the final flag and (char, child id) pairs.
+        """
+        return (self._final,
+                tuple((char, id(child)) for char, child in self._edges.items()))
+
+    def __repr__(self) -> str:
+        """
+        Get the string representation of the node.
+        :return: The outgoing edge labels, with a trailing '$' for a final state.
+        """
+        return "".join(self._edges) + ("$" if self._final else "")
+
+
+class Dawg:
+    """
+    An immutable set of strings stored as a minimal acyclic automaton.
+
+    Words that share a prefix share the path from the root, and words that
+    share a suffix share the path into the final state, so a vocabulary
+    with many common endings needs far fewer nodes than a `TSTree`.
+    Build it with `Dawg.from_sorted(words)` or `TSTree.freeze()`.
+    """
+    def __init__(self, root: DawgNode | None = None, word_count: int = 0):
+        """
+        Initialize the automaton; use `from_sorted` rather than calling this.
+        :param root: The start state.
+        :param word_count: Number of words accepted by the automaton.
+        """
+        self._root = root if root is not None else DawgNode()
+        self._word_count = word_count
+
+    @classmethod
+    def from_sorted(cls, words: Iterable[str]) -> "Dawg":
+        """
+        Build the minimal automaton incrementally from sorted words
+        (Daciuk et al., 2000). Duplicates are ignored.
+        :param words: Words in ascending order.
+        :return: The frozen automaton.
+        """
+        root = DawgNode()
+        register = {}
+        unchecked = []          # (parent, char, child) along the last word
+        previous = None
+        count = 0
+
+        for word in words:
+            if previous is not None:
+                if word == previous:
+                    continue
+                if word < previous:
+                    raise ValueError(f"words must be sorted: {word!r} after {previous!r}")
+                common = 0
+                for a, b in zip(word, previous):
+                    if a != b:
+                        break
+                    common += 1
+            else:
+                common = 0
+
+            cls._minimise(unchecked, register, common)
+            node = unchecked[-1][2] if unchecked else root
+            for char in word[common:]:
+                child = DawgNode()
+                node._edges[char] = child
+                unchecked.append((node, char, child))
+                node = child
+            node._final = True
+            previous = word
+            count += 1
+
+        cls._minimise(unchecked, register, 0)
+        return cls(root, count)
+
+    @staticmethod
+    def _minimise(unchecked: list, register: dict, down_to: int) -> None:
+        """
+        Replace the states on the unchecked path below depth `down_to` by
+        equivalent registered states, registering the new ones.
+        :param unchecked: Stack of (parent, char, child) edges.
+        :param register: Signature -> representative state.
+        :param down_to: Depth of the common prefix with the next word.
+        """
+        while len(unchecked) > down_to:
+            parent, char, child = unchecked.pop()
+            signature = child._signature()
+            existing = register.get(signature)
+            if existing is not None:
+                parent._edges[char] = existing
+            else:
+                register[signature] = child
+
+    def _walk(self, prefix: str) -> DawgNode | None:
+        """
+        Follow `prefix` from the root.
+        :param prefix: The characters to follow.
+        :return: The state reached, or None if the prefix is not present.
+        """
+        node = self._root
+        for char in prefix:
+            node = node._edges.get(char)
+            if node is None:
+                return None
+        return node
+
+    def search(self, string: str) -> bool:
+        """
+        Search for a string in the automaton.
+        :param string: The string to search for.
+        :return: True if the string is found, False otherwise.
+        """
+        node = self._walk(string)
+        return node is not None and node._final
+
+    def __contains__(self, string: str) -> bool:
+        return self.search(string)
+
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        """
+        Yield every word starting with `prefix`, in sorted order.
+        :param prefix: The prefix to complete.
+        :return: Generator of words.
+        """
+        start = self._walk(prefix)
+        if start is None:
+            return
+        stack = [(start, prefix)]
+        while stack:
+            node, word = stack.pop()
+            if node._final:
+                yield word
+            # push in reverse so the smallest character is visited first
+            for char, child in reversed(node._edges.items()):
+                stack.append((child, word + char))
+
+    def __iter__(self) -> Iterator[str]:
+        """
+        Iterate over all words in sorted order.
+        """
+        return self.iter_prefix("")
+
+    def all_strings(self) -> list:
+        """
+        Collect all strings in the automaton.
+        :return: Sorted list of all strings.
+        """
+        return list(self)
+
+    def word_count(self) -> int:
+        """
+        Get the number of words accepted by the automaton.
+        :return: The number of words.
+        """
+        return self._word_count
+
+    def __len__(self) -> int:
+        """
+        Get the number of distinct states, comparable with `len(TSTree)`.
+        :return: The number of nodes reachable from the root.
+        """
+        seen = {id(self._root)}
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            for child in node._edges.values():
+                if id(child) not in seen:
+                    seen.add(id(child))
+                    stack.append(child)
+        return len(seen)
+
+    def __repr__(self) -> str:
+        """
+        Get the string representation of the automaton.
+        :return: A short summary of its size.
+        """
+        return f"Dawg({self._word_count} words, {len(self)} nodes)"
@@ -0,0 +1,93 @@
+# Bounded LRU cache from prefixes to TSTree nodes
+from collections import OrderedDict, namedtuple
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "resumes", "misses", "evictions",
+                                     "currsize", "maxsize"])
+
+# returned by `get` for prefixes that are not cached at all (None is a
+# cached "this prefix is not in the tree")
+MISSING = object()
+
+
+class PrefixCache:
+    """
+    Maps recently used prefixes to the `TSTreeNode` of their last character,
+    evicting the least recently used entry when full.
+
+    Nodes never move once inserted, so cached nodes stay valid as the tree
+    grows; only cached absences (None) can become stale, and
+    `invalidate_prefixes` drops those for every prefix of an inserted word.
+    """
+    def __init__(self, maxsize: int):
+        """
+        :param maxsize: Maximum number of cached prefixes.
+        """
+        if maxsize <= 0:
+            raise ValueError("maxsize must be a positive integer")
+        self._data = OrderedDict()
+        self._maxsize = maxsize
+        self._absent = 0
+        self.hits = self.resumes = self.misses = self.evictions = 0
+
+    def get(self, prefix: str):
+        """
+        Look up a prefix and mark it as recently used.
+        :param prefix: The prefix to look up.
+        :return: The cached node, None for a cached absence, or MISSING.
+        """
+        node = self._data.get(prefix, MISSING)
+        if node is not MISSING:
+            self._data.move_to_end(prefix)
+        return node
+
+    def put(self, prefix: str, node) -> None:
+        """
+        Cache the node (or None) for a prefix, evicting if full.
+        :param prefix: The prefix.
+        :param node: Its node, or None if the prefix is not in the tree.
+        """
+        previous = self._data.get(prefix, MISSING)
+        if previous is None:
+            self._absent -= 1
+        self._data[prefix] = node
+        self._data.move_to_end(prefix)
+        if node is None:
+            self._absent += 1
+        if len(self._data) > self._maxsize:
+            _, evicted = self._data.popitem(last=False)
+            if evicted is None:
+                self._absent -= 1
+            self.evictions += 1
+
+    def invalidate_prefixes(self, word: str) -> None:
+        """
+        Drop cached absences for every prefix of a newly inserted word.
+        :param word: The inserted word.
+        """
+        if not self._absent:
+            return
+        data = self._data
+        for end in range(1, len(word) + 1):
+            prefix = word[:end]
+            if prefix in data and data[prefix] is None:
+                del data[prefix]
+                self._absent -= 1
+
+    def clear(self) -> None:
+        """
+        Remove every entry (counters are kept).
+        """
+        self._data.clear()
+        self._absent = 0
+
+    def info(self) -> CacheInfo:
+        """
+        Hit, resume (lookup continued from the cached parent prefix), miss
+        and eviction counters plus the current and maximum size.
+        """
+        return CacheInfo(self.hits, self.resumes, self.misses, self.evictions,
+                         len(self._data), self._maxsize)
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,276 @@
+# Ternary search tree sharded by key range across worker processes
+import multiprocessing
+import random
+import sys
+from bisect import bisect_left, bisect_right
+from typing import Iterable, Iterator, List
+
+from src.tstree.tstree import TSTree
+
+
+def _shard_worker(conn) -> None:
+    """
+    Serve one `TSTree` over a pipe until "close" is received.
+    :param conn: The worker end of a `multiprocessing.Pipe`.
+    """
+    sys.setrecursionlimit(100_000)      # TSTree insert/search recurse per character
+    tree = TSTree()
+    while True:
+        command, arg = conn.recv()
+        if command == "close":
+            conn.close()
+            return
+        try:
+            if command == "insert_many":
+                for word in arg:
+                    tree.insert(word)
+                reply = None
+            elif command == "search_many":
+                reply = [tree.search(word) for word in arg]
+            elif command == "prefix":
+                reply = list(tree.iter_prefix(arg))
+            elif command == "range":
+                reply = list(tree.range(*arg))
+            elif command == "len":
+                reply = len(tree)
+            else:
+                raise ValueError(f"unknown command {command!r}")
+        except Exception as e:      # sent back so the worker survives bad input
+            reply = e
+        conn.send(reply)
+
+
+def split_points(sample: Iterable[str], n_shards: int, min_prefix: int = 1) -> List[str]:
+    """
+    Choose shard boundaries from a sample of keys. At each sample quantile
+    the boundary is the shortest leading-character prefix (at least
+    `min_prefix` long) of the quantile key that still sorts after the key
+    before it, so the sample splits exactly at the quantiles and no shard
+    is left empty. Shard i then holds keys in [points[i - 1], points[i]).
+    :param sample: Representative keys.
+    :param n_shards: Number of shards wanted.
+    :param min_prefix: Shortest boundary prefix.
+    :return: Sorted boundaries; fewer than n_shards - 1 if the sample is small.
+    """
+    keys = sorted(set(word for word in sample if word))
+    points = []
+    for j in sorted(set(i * len(keys) // n_shards for i in range(1, n_shards))):
+        if j == 0:
+            continue
+        before, key = keys[j - 1], keys[j]
+        length = min_prefix
+        while key[:length] <= before:      # ends at len(key), since key > before
+            length += 1
+        points.append(key[:length])
+    return points
+
+
+def _prefix_end(prefix: str) -> str | None:
+    """
+    Smallest string greater than every string starting with `prefix`,
+    or None if there is none.
+    """
+    while prefix:
+        last = ord(prefix[-1])
+        if last < sys.maxunicode:
+            return prefix[:-1] + chr(last + 1)
+        prefix = prefix[:-1]
+    return None
+
+
+class ShardedTSTree:
+    """
+    A `TSTree` split by key range over worker processes, one shard each.
+
+    Keys are routed by leading-character boundaries chosen from a sample,
+    so every shard holds a contiguous, ordered key range: batch inserts and
+    searches run on all shards in parallel, and ordered results from
+    several shards are merged by simple concatenation in shard order.
+    Single `insert`/`search` calls pay one pipe round trip; use the
+    `*_many` methods for throughput.
+    """
+    def __init__(self, n_workers: int, sample: Iterable[str] | None = None,
+                 min_prefix: int = 1, mp_context: str | None = None):
+        """
+        Start the worker processes.
+        :param n_workers: Number of shards / processes.
+        :param sample: Keys used to balance the shards; without a sample the
+                       lowercase alphabet is split evenly.
+        :param min_prefix: Shortest boundary prefix, see `split_points`.
+        :param mp_context: multiprocessing start method ("fork", "spawn", ...).
+        """
+        if n_workers < 1:
+            raise ValueError("n_workers must be a positive integer")
+        if sample is None:
+            letters = "abcdefghijklmnopqrstuvwxyz"
+            sample = [letters[i * 26 // n_workers] for i in range(n_workers)]
+        self._points = split_points(sample, n_workers, min_prefix)
+
+        ctx = multiprocessing.get_context(mp_context)
+        self._conns, self._procs = [], []
+        for _ in range(len(self._points) + 1):
+            parent, child = ctx.Pipe()
+            proc = ctx.Process(target=_shard_worker, args=(child,), daemon=True)
+            proc.start()
+            child.close()
+            self._conns.append(parent)
+            self._procs.append(proc)
+
+    @classmethod
+    def build(cls, words: List[str], n_workers: int, sample_size: int = 1000,
+              **kwargs) -> "ShardedTSTree":
+        """
+        Balance shards on a random sample of `words`, then insert them all
+        in parallel.
+        :param words: The keys.
+        :param n_workers: Number of shards / processes.
+        :param sample_size: Keys drawn to choose the boundaries.
+        :return: The filled tree.
+        """
+        sample = random.Random(0).sample(words, min(sample_size, len(words)))
+        tree = cls(n_workers, sample, **kwargs)
+        tree.insert_many(words)
+        return tree
+
+    @property
+    def n_shards(self) -> int:
+        return len(self._conns)
+
+    def _shard(self, key: str) -> int:
+        return bisect_right(self._points, key)
+
+    def _shards_between(self, lo: str | None, hi: str | None) -> range:
+        """
+        Shards whose key range overlaps [lo, hi).
+        """
+        first = 0 if lo is None else bisect_right(self._points, lo)
+        last = len(self._points) if hi is None else bisect_left(self._points, hi)
+        return range(first, last + 1)
+
+    def _scatter(self, words: Iterable[str]) -> List[List[int]]:
+        """
+        Group word positions by shard.
+        """
+        groups = [[] for _ in self._conns]
+        points = self._points
+        for i, word in enumerate(words):
+            groups[bisect_right(points, word)].append(i)
+        return groups
+
+    def _ask(self, shards, command: str, args) -> list:
+        """
+        Send one command per shard, then collect the replies, so the shards
+        work concurrently. Every reply is read before the first error a
+        shard sent back is raised, so no stale reply is left in a pipe.
+        """
+        shards = list(shards)
+        for shard, arg in zip(shards, args):
+            self._conns[shard].send((command, arg))
+        replies = [self._conns[shard].recv() for shard in shards]
+        for reply in replies:
+            if isinstance(reply, Exception):
+                raise reply
+        return replies
+
+    def insert(self, string: str) -> None:
+        """
+        Insert a string into its shard.
+        :param string: The string to insert.
+        """
+        self._ask([self._shard(string)], "insert_many", [[string]])
+
+    def insert_many(self, words: Iterable[str]) -> None:
+        """
+        Insert many strings, all shards building in parallel.
+        :param words: The strings to insert.
+        """
+        words = list(words)
+        groups = self._scatter(words)
+        shards = [s for s, group in enumerate(groups) if group]
+        self._ask(shards, "insert_many", [[words[i] for i in groups[s]] for s in shards])
+
+    def search(self, string: str) -> bool:
+        """
+        Search for a string in its shard.
+        :param string: The string to search for.
+        :return: True if the string is found, False otherwise.
+        """
+        return self._ask([self._shard(string)], "search_many", [[string]])[0][0]
+
+    def search_many(self, words: Iterable[str]) -> List[bool]:
+        """
+        Search many strings in parallel.
+        :param words: The strings to search for.
+        :return: One bool per word, in input order.
+        """
+        words = list(words)
+        groups = self._scatter(words)
+        shards = [s for s, group in enumerate(groups) if group]
+        replies = self._ask(shards, "search_many", [[words[i] for i in groups[s]] for s in shards])
+        found = [False] * len(words)
+        for shard, reply in zip(shards, replies):
+            for i, hit in zip(groups[shard], reply):
+                found[i] = hit
+        return found
+
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        """
+        Iterate over all strings starting with `prefix`, in sorted order,
+        asking only the shards whose range can hold them.
+        :param prefix: The prefix to complete.
+        """
+        shards = self._shards_between(prefix or None, _prefix_end(prefix) if prefix else None)
+        for words in self._ask(shards, "prefix", [prefix] * len(shards)):
+            yield from words
+
+    def range(self, lo: str | None = None, hi: str | None = None) -> Iterator[str]:
+        """
+        Iterate over the strings w with lo <= w < hi, in sorted order.
+        :param lo: Inclusive lower bound, or None for no bound.
+        :param hi: Exclusive upper bound, or None for no bound.
+        """
+        shards = self._shards_between(lo, hi)
+        for words in self._ask(shards, "range", [(lo, hi)] * len(shards)):
+            yield from words
+
+    def all_strings(self) -> list:
+        """
+        Collect all strings of every shard.
+        :return: Sorted list of all strings.
+        """
+        return list(self.range())
+
+    def shard_sizes(self) -> List[int]:
+        """
+        Node count per shard, to check the balance.
+        """
+        return self._ask(range(self.n_shards), "len", [None] * self.n_shards)
+
+    def __len__(self) -> int:
+        """
+        Get the total node count over all shards, as `len(TSTree)`.
+        """
+        return sum(self.shard_sizes())
+
+    def close(self) -> None:
+        """
+        Stop the worker processes.
+        """
+        for conn in self._conns:
+            try:
+                conn.send(("close", None))
+                conn.close()
+            except (OSError, BrokenPipeError):
+                pass
+        for proc in self._procs:
+            proc.join(timeout=5)
+        self._conns, self._procs = [], []
+
+    def __enter__(self) -> "ShardedTSTree":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"ShardedTSTree({self.n_shards} shards, boundaries={self._points})"
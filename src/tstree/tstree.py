@@ -1,4 +1,9 @@
 # Ternary Search Tree implementation
+from typing import Iterator
+
+from src.tstree.prefix_cache import MISSING, PrefixCache
+
+
 class TSTreeNode:
     """A node in a tree structure."""
     def __init__(self, char: str):
@@ -66,6 +71,28 @@ class TSTreeNode:
                 return False
             return self._eq._search(string, index + 1)
 
+    def _find(self, string: str, index: int = 0):
+        """
+        Find the node of the last character of `string`, starting at this
+        node with character `string[index]`. Iterative, like a search that
+        returns where it stopped.
+        :param string: The string (or prefix) to look for.
+        :param index: The index of the character to compare.
+        :return: The node, or None if `string` is not a path in the tree.
+        """
+        node, last = self, len(string) - 1
+        while node is not None:
+            char = string[index]
+            if char < node._char:
+                node = node._lt
+            elif char > node._char:
+                node = node._gt
+            elif index == last:
+                return node
+            else:
+                node, index = node._eq, index + 1
+        return None
+
     def _all_strings(self, prefix: str = "", strings: list = None) -> list:
         """
         all_strings recursively collects all complete words that exist in the tree.
@@ -84,14 +111,15 @@ class TSTreeNode:
         # Add current character to prefix
         current_prefix = prefix + self._char
 
-        # If this is the end of a word, add it to results
-        if self._is_end:
-            strings.append(current_prefix)
-
         # Continue search in left child (same prefix)
         if self._lt is not None:
             self._lt._all_strings(prefix, strings)
 
+        # If this is the end of a word, add it to results (after the smaller
+        # words of the left child, so the list comes out sorted)
+        if self._is_end:
+            strings.append(current_prefix)
+
         # Continue search in equal child (with updated prefix)
         if self._eq is not None:
             self._eq._all_strings(current_prefix, strings)
@@ -101,6 +129,49 @@ class TSTreeNode:
             self._gt._all_strings(prefix, strings)
         return strings
 
+    def _range(self, lo: str | None, hi: str | None,
+               reverse: bool = False, prefix: str = "") -> Iterator[str]:
+        """
+        Lazily yield the words w with lo <= w < hi in sorted order, skipping
+        every subtree that lies entirely outside the bounds.
+        Uses an explicit stack, so degenerate chains do not hit the
+        recursion limit.
+        :param lo: Inclusive lower bound, or None for no bound.
+        :param hi: Exclusive upper bound, or None for no bound.
+        :param reverse: Yield in descending order if True.
+        :param prefix: The characters on the path above this node.
+        :return: Generator of words.
+        """
+        stack = [(self, prefix)]
+        while stack:
+            node, prefix = stack.pop()
+            if node.__class__ is str:
+                yield node
+                continue
+
+            current = prefix + node._char
+            n = len(current)
+            # every word below `current` (and `current` itself) is < lo / >= hi
+            below_lo = lo is not None and current < lo[:n]
+            above_hi = hi is not None and (current > hi[:n] or current.startswith(hi))
+            # the lt / gt siblings only hold words < current / > current
+            visit_lt = node._lt is not None and not (lo is not None and current <= lo[:n])
+            visit_gt = node._gt is not None and not (hi is not None and current >= hi[:n])
+
+            children = []
+            if visit_lt:
+                children.append((node._lt, prefix))
+            if not (below_lo or above_hi):
+                if node._is_end and (lo is None or current >= lo) and (hi is None or current < hi):
+                    children.append((current, None))
+                if node._eq is not None:
+                    children.append((node._eq, current))
+            if visit_gt:
+                children.append((node._gt, prefix))
+
+            # the stack pops last-in first, so push in reverse of visit order
+            stack.extend(children if reverse else reversed(children))
+
     def __len__(self) -> int:
         """
         Get the total number of nodes in the subtree rooted at this node.
@@ -151,11 +222,26 @@ class TSTreeNode:
 
 class TSTree:
     """A ternary search tree."""
-    def __init__(self):
+    def __init__(self, expected_keys: int | None = None, fp_rate: float = 0.01,
+                 cache_size: int | None = None):
         """
         Initialize the tree.
+        :param expected_keys: If given, keep a Bloom filter sized for this
+            many keys in front of the tree, so most misses return without
+            descending it.
+        :param fp_rate: Target false-positive rate of the Bloom filter.
+        :param cache_size: If given, keep an LRU cache of this many
+            prefix -> node entries, so repeated searches and completions
+            resume from the cached node instead of the root.
         """
         self._root: TSTreeNode = None  
+        self._filter = None
+        if expected_keys is not None:
+            from src.bloom.bloom import BloomFilter
+            self._filter = BloomFilter(expected_keys, fp_rate)
+        self._cache = None
+        if cache_size is not None:
+            self._cache = PrefixCache(cache_size)
 
     def insert(self, string: str) -> None:
         """
@@ -168,6 +254,10 @@ class TSTree:
         if self._root is None:
             self._root = TSTreeNode(string[0])
         self._root._insert(string)
+        if self._filter is not None:
+            self._filter.add(string)
+        if self._cache is not None:
+            self._cache.invalidate_prefixes(string)
 
     def search(self, string: str) -> bool:
         """
@@ -177,17 +267,162 @@ class TSTree:
         """
         if self._root is None:
             return False
-        return self._root._search(string)
+        if self._filter is not None and not self._filter.might_contain(string):
+            return False
+        if not string:
+            return False
+        # the same iterative walk with or without the cache, so the cache
+        # is the only difference between the two
+        node = self._prefix_node(string)
+        return node is not None and node._is_end
+
+    def _prefix_node(self, prefix: str):
+        """
+        Find the node of the last character of a non-empty prefix, through
+        the cache when there is one: an exact cache hit returns at once, a
+        cached parent prefix resumes the walk one character from the end.
+        :param prefix: The prefix to look up.
+        :return: The node, or None if the prefix is not in the tree.
+        """
+        cache = self._cache
+        if cache is None:
+            return self._root._find(prefix)
+
+        node = cache.get(prefix)
+        if node is not MISSING:
+            cache.hits += 1
+            return node
+
+        parent = cache.get(prefix[:-1]) if len(prefix) > 1 else MISSING
+        if parent is MISSING:
+            cache.misses += 1
+            node = self._root._find(prefix)
+        else:
+            cache.resumes += 1
+            if parent is None or parent._eq is None:
+                node = None
+            else:
+                node = parent._eq._find(prefix, len(prefix) - 1)
+        cache.put(prefix, node)
+        return node
+
+    def iter_prefix(self, prefix: str = "") -> Iterator[str]:
+        """
+        Iterate over all strings starting with `prefix` (autocomplete), in
+        sorted order. With a cache, a repeated prefix skips the descent.
+        :param prefix: The prefix to complete.
+        :return: Generator of strings.
+        """
+        if self._root is None:
+            return iter(())
+        if not prefix:
+            return self._root._range(None, None)
+        node = self._prefix_node(prefix)
+        if node is None:
+            return iter(())
+        return self._iter_below(node, prefix)
+
+    @staticmethod
+    def _iter_below(node: TSTreeNode, prefix: str) -> Iterator[str]:
+        """
+        Yield `prefix` if it is a word, then every word in the eq subtree.
+        """
+        if node._is_end:
+            yield prefix
+        if node._eq is not None:
+            yield from node._eq._range(None, None, prefix=prefix)
+
+    def cache_info(self):
+        """
+        Counters of the prefix cache.
+        :return: A `CacheInfo` (hits, resumes, misses, evictions, currsize,
+                 maxsize), or None without a cache.
+        """
+        return None if self._cache is None else self._cache.info()
+
+    @property
+    def filter_nbytes(self) -> int:
+        """
+        Size of the Bloom filter in bytes, 0 without a filter.
+        """
+        return 0 if self._filter is None else self._filter.nbytes
+
+    def clear_cache(self) -> None:
+        """
+        Empty the prefix cache, if any.
+        """
+        if self._cache is not None:
+            self._cache.clear()
 
     def all_strings(self) -> list:
         """
         Collect all strings in the tree.
-        :return: List of all strings in the tree.
+        :return: Sorted list of all strings in the tree.
         """
         if self._root is None:
             return []
         return self._root._all_strings()
 
+    def range(self, lo: str | None = None, hi: str | None = None,
+              reverse: bool = False) -> Iterator[str]:
+        """
+        Iterate over the strings w with lo <= w < hi, in sorted order.
+        Only the paths towards the bounds and the returned words are
+        visited, so a page of results costs O(depth + output).
+        :param lo: Inclusive lower bound, or None for no bound.
+        :param hi: Exclusive upper bound, or None for no bound.
+        :param reverse: Iterate in descending order if True.
+        :return: Generator of strings.
+        """
+        if self._root is None:
+            return iter(())
+        return self._root._range(lo, hi, reverse)
+
+    def ceiling(self, string: str) -> str | None:
+        """
+        Smallest stored string >= `string`, or None.
+        """
+        return next(self.range(string, None), None)
+
+    def floor(self, string: str) -> str | None:
+        """
+        Largest stored string <= `string`, or None.
+        """
+        if self.search(string):
+            return string
+        return self.predecessor(string)
+
+    def successor(self, string: str) -> str | None:
+        """
+        Smallest stored string > `string`, or None.
+        """
+        for word in self.range(string, None):
+            if word != string:
+                return word
+        return None
+
+    def predecessor(self, string: str) -> str | None:
+        """
+        Largest stored string < `string`, or None.
+        """
+        return next(self.range(None, string, reverse=True), None)
+
+    def rank(self, string: str) -> int:
+        """
+        Number of stored strings < `string`.
+        The tree keeps no subtree counts, so this costs O(depth + rank).
+        """
+        return sum(1 for _ in self.range(None, string))
+
+    def freeze(self):
+        """
+        Build an immutable, minimised copy of the tree that also shares
+        common suffixes between words.
+        :return: A `Dawg` holding the same strings.
+        """
+        from src.dawg.dawg import Dawg
+        return Dawg.from_sorted(self.range())
+
     def __len__(self) -> int:
         """
         Get the length of the tree.